@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+
+# Copyright 2024, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
+
+# Measures how long Object.makeEventBackend takes for a chain of nested
+# objects, which is where building the output by string concatenation becomes
+# quadratic. Every object can also include a shared header object.
+#
+# Usage: python3 benchmarks/code_emitter.py [depth] [fieldsPerObject] [headerFields]
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils
+import generation_context
+import objects
+
+SCOPE = "general"
+
+def _createObjects(depth, fieldsPerObject, headerFields):
+    normalScope = utils.normalizedScope(SCOPE, "object")
+    scopedObjects = {}
+    if headerFields > 0:
+        header = objects.Object("Header", "", "", False, depth, normalScope, True)
+        for fieldIndex in range(headerFields):
+            newField = objects.ObjectField("header{}".format(fieldIndex), "", "uint")
+            newField.size = 8
+            header.addField(newField)
+        scopedObjects[header.name] = header
+    for index in range(depth):
+        newObject = objects.Object("Level{}".format(index), "", "", 0 == index, 1, normalScope, 0 != index)
+        if headerFields > 0:
+            headerField = objects.ObjectField("header", "", "object", SCOPE)
+            headerField.referenceType = "Header"
+            newObject.addField(headerField)
+        for fieldIndex in range(fieldsPerObject):
+            newField = objects.ObjectField("register{}".format(fieldIndex), "", "uint")
+            newField.size = 16
+            newObject.addField(newField)
+        if index < depth - 1:
+            childField = objects.ObjectField("child", "", "object", SCOPE)
+            childField.referenceType = "Level{}".format(index + 1)
+            newObject.addField(childField)
+        scopedObjects[newObject.name] = newObject
+    return {normalScope: scopedObjects}
+
+def main(depth, fieldsPerObject, headerFields):
+    generation_context.setCurrent(generation_context.createContext("Benchmark"))
+    allObjects = _createObjects(depth, fieldsPerObject, headerFields)
+    generation_context.current().symbolIndex.update(utils.buildSymbolIndex([SCOPE], allObjects, {}, {}, {}))
+    entryObject = allObjects[utils.normalizedScope(SCOPE, "object")]["Level0"]
+
+    startTime = time.perf_counter()
+    output = entryObject.makeEventBackend(utils.normalizedScope(SCOPE, ""), "Level0", {}, {}, allObjects, {}, [SCOPE])
+    elapsedTime = time.perf_counter() - startTime
+
+    print("{} nested objects, {} lines".format(depth, output.count("\n")))
+    print("makeEventBackend: {:8.3f} s".format(elapsedTime))
+
+if __name__ == "__main__":
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    fieldsPerObject = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    headerFields = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), depth * 10))
+    main(depth, fieldsPerObject, headerFields)
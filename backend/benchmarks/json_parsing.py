@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+
+# Copyright 2024, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
+
+# Compares the JSON parsers json_backend can use on a large synthetic
+# objects.json file
+#
+# Usage: python3 benchmarks/json_parsing.py [objectCount] [repeat]
+
+import json
+import os
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json_backend
+
+def _createObjects(objectCount):
+    objectsList = []
+    for index in range(objectCount):
+        fields = []
+        for fieldIndex in range(12):
+            fields.append({
+                "name": "field{}".format(fieldIndex),
+                "description": "Synthetic field {} of object {}".format(fieldIndex, index),
+                "type": "uint",
+                "size": 16,
+                "notes": ""
+            })
+        fields.append({
+            "name": "child",
+            "description": "",
+            "type": "object",
+            "referenceType": "Object{}".format((index + 1) % objectCount),
+            "scope": "general",
+            "conditional": {"and": [{"indicator": "field0", "operator": "=", "value": 1},
+                                    {"indicator": "field1", "operator": ">", "value": 3}]}
+        })
+        objectsList.append({
+            "name": "Object{}".format(index),
+            "reference": "",
+            "notes": "",
+            "logIndependently": False,
+            "logWithParent": True,
+            "referenceCount": 1,
+            "dependsOn": [],
+            "fields": fields
+        })
+    return objectsList
+
+def _parsers():
+    parsers = [("json", json.loads)]
+    if json_backend.orjson is not None:
+        parsers.append(("orjson", json_backend.orjson.loads))
+    if json_backend.msgspec is not None:
+        parsers.append(("msgspec", json_backend.msgspec.json.decode))
+    return parsers
+
+def main(objectCount, repeat):
+    with tempfile.TemporaryDirectory() as folder:
+        filePath = os.path.join(folder, "objects.json")
+        with open(filePath, "w") as file:
+            json.dump(_createObjects(objectCount), file, indent=4)
+        with open(filePath, "rb") as file:
+            data = file.read()
+
+        print("{} objects, {:.1f} MB, selected backend: {}".format(objectCount, len(data) / 1000000, json_backend.BACKEND_NAME))
+        baseline = None
+        for name, parser in _parsers():
+            seconds = min(timeit.repeat(lambda: parser(data), number=1, repeat=repeat))
+            if baseline is None:
+                baseline = seconds
+            print("{:<8} {:8.3f} s  {:5.1f}x".format(name, seconds, baseline / seconds))
+
+if __name__ == "__main__":
+    objectCount = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    main(objectCount, repeat)
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+
+# Copyright 2024, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
+
+# Measures the memory used to load a synthetic protocol with a large number of
+# fields through json_processing.loadFiles
+#
+# Usage: python3 benchmarks/memory_model.py [fieldCount] [fieldsPerObject]
+
+import json
+import os
+import resource
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils
+import generation_context
+import json_processing
+
+SCOPE = "general"
+
+def _createObjects(fieldCount, fieldsPerObject):
+    objectsList = []
+    for index in range((fieldCount + fieldsPerObject - 1) // fieldsPerObject):
+        fields = []
+        for fieldIndex in range(fieldsPerObject):
+            fields.append({
+                "name": "register{}".format(fieldIndex),
+                "description": "",
+                "type": "uint",
+                "size": 16,
+                "inputs": [{"source": "self.length", "minus": 2}]
+            })
+        objectsList.append({
+            "name": "Block{}".format(index),
+            "reference": "",
+            "notes": "",
+            "logIndependently": False,
+            "logWithParent": True,
+            "referenceCount": 1,
+            "dependsOn": [{"name": "length", "type": "uint", "size": 16}],
+            "fields": fields
+        })
+    return objectsList
+
+def _createSwitches(fieldCount):
+    options = []
+    for value in range(fieldCount // 10):
+        options.append({"value": value, "action": {"name": "block{}".format(value), "type": "object", "referenceType": "Block{}".format(value), "scope": SCOPE}})
+    return [{"name": "BlockSwitch", "referenceCount": 1, "dependsOn": {"name": "command", "type": "uint", "size": 8}, "options": options}]
+
+def main(fieldCount, fieldsPerObject):
+    generation_context.setCurrent(generation_context.createContext("Benchmark"))
+    with tempfile.TemporaryDirectory() as folder:
+        os.makedirs(os.path.join(folder, SCOPE))
+        with open(os.path.join(folder, SCOPE, "objects.json"), "w") as file:
+            json.dump(_createObjects(fieldCount, fieldsPerObject), file)
+        with open(os.path.join(folder, SCOPE, "switches.json"), "w") as file:
+            json.dump(_createSwitches(fieldCount), file)
+
+        startingRss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        loadedFiles = json_processing.loadFiles(folder, [SCOPE])
+        peakRss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        objectCount = len(loadedFiles[0][utils.normalizedScope(SCOPE, "object")])
+        del loadedFiles
+
+        # Load a second time with tracing enabled to see how much of that is
+        # kept by the loaded structures
+        tracemalloc.start()
+        loadedFiles = json_processing.loadFiles(folder, [SCOPE])
+        retainedSize, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    # ru_maxrss is reported in kilobytes on Linux
+    print("{} fields in {} objects".format(fieldCount, objectCount))
+    print("Peak RSS:               {:8.1f} MB (before loading {:.1f} MB)".format(peakRss / 1000, startingRss / 1000))
+    print("Retained after loading: {:8.1f} MB ({:.0f} bytes per field)".format(retainedSize / 1000000, retainedSize / fieldCount))
+
+if __name__ == "__main__":
+    fieldCount = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    fieldsPerObject = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    main(fieldCount, fieldsPerObject)
@@ -5,6 +5,8 @@ from math import ceil
 
 class BitfieldField:
     # enumFields are different options inside an enumeration
+    __slots__ = ("name", "description", "notes", "type", "bits", "referenceType", "scope")
+
     def __init__(self, name, description, fieldType, bits, scope = ""):
         self.name = name
         self.description = description
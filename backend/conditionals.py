@@ -0,0 +1,30 @@
+# Copyright 2024, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
+
+# This file contains the parsed form of field conditionals. Conditionals are
+# interned, so every field gated on the same condition shares one instance and
+# its rendered Spicy strings.
+
+class Conditional:
+    __slots__ = ("tokens", "indicators", "spicyStrings")
+
+    def __init__(self, tokens):
+        # Tuples of (type, value) or, for indicators, (type, value, index of
+        # the value the indicator is compared against)
+        self.tokens = tuple(tokens)
+        self.indicators = tuple(token for token in self.tokens if "indicator" == token[0])
+        # enum prefixes -> rendered Spicy expression
+        self.spicyStrings = {}
+
+    def createSpicyString(self, enumPrefixes):
+        # enumPrefixes holds, for each indicator, the "scope::enumType" used to
+        # qualify the value it is compared against, or None
+        if enumPrefixes not in self.spicyStrings:
+            values = [token[1] for token in self.tokens]
+            for index, token in enumerate(self.tokens):
+                if "operator" == token[0] and "=" == token[1]:
+                    values[index] = "=="
+            for indicator, enumPrefix in zip(self.indicators, enumPrefixes):
+                if enumPrefix is not None:
+                    values[indicator[2]] = "{0}::{1}".format(enumPrefix, values[indicator[2]])
+            self.spicyStrings[enumPrefixes] = "".join(str(value) for value in values)
+        return self.spicyStrings[enumPrefixes]
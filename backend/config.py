@@ -1,6 +1,6 @@
 import os
 import customtypes
-import json
+import json_backend
 import base64
 
 class Config:
@@ -21,12 +21,13 @@ class Config:
         self.longDescription = ""
         
 def loadConfig(configFilePath):
-    config = Config()
     if not (os.path.isfile(configFilePath)):
-        return (False, config)
+        return (False, Config())
     
-    with open(configFilePath, "r+") as file:
-        configObject = json.load(file)
+    return (True, loadConfigObject(json_backend.loadFile(configFilePath)))
+
+def loadConfigObject(configObject):
+    config = Config()
 
     config.protocol = configObject["Protocol"]
     config.scopes = configObject["Scopes"]
@@ -66,4 +67,4 @@ def loadConfig(configFilePath):
     if "protocolLongDescription" in configObject and "" != configObject.get("protocolLongDescription"):
         config.longDescription = configObject["protocolLongDescription"]
     
-    return (True, config)                        
+    return config                        
@@ -3,6 +3,8 @@
 import utils
 
 class CustomType:
+    __slots__ = ("name", "interpretingFunction", "returnType")
+
     def __init__(self, name, interpretingFunction, returnType):
         self.name = name
         self.interpretingFunction = interpretingFunction
@@ -0,0 +1,22 @@
+# Copyright 2024, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
+
+# This file contains the emitter used to build generated code. Fragments are
+# collected in a list and joined once, so nested generators can share one
+# emitter instead of repeatedly copying a growing string.
+import utils
+
+class Emitter:
+    def __init__(self):
+        self.fragments = []
+
+    def write(self, text):
+        self.fragments.append(text)
+
+    def line(self, tabSize, text):
+        # Writes text on its own line, indented by tabSize tabs
+        self.fragments.append(utils.getTabString(tabSize))
+        self.fragments.append(text)
+        self.fragments.append("\n")
+
+    def getValue(self):
+        return "".join(self.fragments)
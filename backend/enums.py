@@ -1,9 +1,12 @@
 # Copyright 2024, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
 
 import utils
+import emitter
 from math import ceil 
 class EnumField:
     # enumFields are different options inside an enumeration
+    __slots__ = ("name", "loggingValue", "value", "notes")
+
     def __init__(self, name, loggingValue, value):
         self.name = name
         self.loggingValue = loggingValue
@@ -36,24 +39,24 @@ class Enums:
 
     def createSpicyEnumString(self):
         # Create spicy-side structures
+        output = emitter.Emitter()
         if self.reference != "":
-            enumString = "# {0}\n".format(self.reference)
-        else:
-            enumString = ""
-        enumString += "public type {0} = enum {{\n".format(self.name)
+            output.write("# {0}\n".format(self.reference))
+        output.write("public type {0} = enum {{\n".format(self.name))
         for index, field in enumerate(self.fields):
             padding_size = self.column - len(field.name)
             padding = " " * padding_size
             commaString=","
             if index == len(self.fields) - 1:
                 commaString = ""
-            enumString += "{0}{1}{2}= {3}{4}\n".format(utils.SINGLE_TAB, field.name, padding, field.value, commaString)
-        enumString += "};\n"
-        return enumString
+            output.line(1, "{0}{1}= {2}{3}".format(field.name, padding, field.value, commaString))
+        output.write("};\n")
+        return output.getValue()
 
     def createZeekEnumString(self, enumScope):
         # This function creates the zeek structure to change an enum into a human readable string
-        zeekString = "{}const {} = {{\n".format(utils.SINGLE_TAB, utils.commandNameToConst(self.name).upper())
+        output = emitter.Emitter()
+        output.line(1, "const {} = {{".format(utils.commandNameToConstUpper(self.name)))
         scopingValue = "[{}::{}_".format(enumScope, self.name) #Indicates the exported zeek name for zeek-side enums
         for i, field in enumerate(self.fields):
             longestValue = len(scopingValue) + 1 + self.longestField #Scope + longest field + closing ]
@@ -63,8 +66,8 @@ class Enums:
             lineEnd = ","
             if len(self.fields) - 1 == i:
                 lineEnd = ""
-            zeekString += "{}{}{}]{}= \"{}\"{}\n".format(utils.DOUBLE_TAB, scopingValue, field.name, padding, field.loggingValue, lineEnd)
-        zeekString += "{}}}".format(utils.SINGLE_TAB)
-        zeekString += " &default=function(i: {}::{}):string".format(enumScope, self.name)
-        zeekString += "{return fmt(\"unknown-0x%x\", i); } &redef;\n\n"
-        return zeekString
+            output.line(2, "{}{}]{}= \"{}\"{}".format(scopingValue, field.name, padding, field.loggingValue, lineEnd))
+        output.write("{}}}".format(utils.SINGLE_TAB))
+        output.write(" &default=function(i: {}::{}):string".format(enumScope, self.name))
+        output.write("{return fmt(\"unknown-0x%x\", i); } &redef;\n\n")
+        return output.getValue()
@@ -1,6 +1,8 @@
 # Copyright 2024, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
 
 import utils
+import generation_context
+import emitter
 
 DEFAULT_ARGUMENTS = ["$conn", "$is_orig"]
 
@@ -13,7 +15,7 @@ class SpicyEvent:
         self.name = ""
         self.trigger = "on"
         self.scope = ""
-        if utils.USES_LAYER_2:
+        if generation_context.current().usesLayer2:
             self.arguments = []
         else:
             self.arguments = DEFAULT_ARGUMENTS
@@ -46,16 +48,20 @@ class SpicyEvent:
                     scopedArguments.append("self.{}".format(field.name))
         else:
             scopedArguments.append("self".format(self.scope, self.name))
+        output = emitter.Emitter()
+        output.write(basicEvent)
         for argument in scopedArguments:
             if argument != scopedArguments[-1]:
-                basicEvent += "{}{},\n".format(utils.SINGLE_TAB, argument)
+                output.line(1, "{},".format(argument))
             else:
-                basicEvent += "{}{}\n);\n\n".format(utils.SINGLE_TAB, argument)
-        return basicEvent
+                output.line(1, argument)
+                output.write(");\n\n")
+        return output.getValue()
 
     def getEventFunctionName(self, allBitfields):
+        context = generation_context.current()
         eventName = ""
-        if utils.USES_LAYER_2:
+        if context.usesLayer2:
             eventName += "event {}::{}Evt (".format(self.scope, self.name)
         else:
             eventName += "event {}::{}Evt (c: connection, is_orig: bool, ".format(self.scope, self.name)
@@ -70,8 +76,8 @@ class SpicyEvent:
                         print("Enum field: {} has no scope".format(field.name))
                 elif field.type in utils.spicyToZeek:
                     eventName += "{}: {}".format(field.name, utils.spicyToZeek[field.type])
-                elif field.type in utils.customFieldTypes:
-                    eventName += "{}: {}".format(field.name, utils.zeekTypeMapping(utils.customFieldTypes[field.type].returnType))
+                elif field.type in context.customFieldTypes:
+                    eventName += "{}: {}".format(field.name, utils.zeekTypeMapping(context.customFieldTypes[field.type].returnType))
                 elif field.type == "bits":
                     referencedBitfield = allBitfields[utils.normalizedScope(field.scope, "bitfield")][field.referenceType]
                     for bitField in referencedBitfield.fields:
@@ -82,8 +88,8 @@ class SpicyEvent:
                                 print("Enum field: {} has no scope".format(bitField.name))
                         elif bitField.type in utils.spicyToZeek:
                             eventName += "{}: {}".format(bitField.name, utils.spicyToZeek[bitField.type])
-                        elif bitField.type in utils.customFieldTypes:
-                            eventName += "{}: {},".format(bitField.name, utils.zeekTypeMapping(utils.customFieldTypes[bitField.type].returnType))
+                        elif bitField.type in context.customFieldTypes:
+                            eventName += "{}: {},".format(bitField.name, utils.zeekTypeMapping(context.customFieldTypes[bitField.type].returnType))
                         elif bitField.type == "enum":
                             if field.scope != "":
                                 eventName += "{}: {}::{}".format(bitField.name, bitField.scope, bitField.referenceType)
@@ -0,0 +1,53 @@
+# Copyright 2024, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
+
+# This file contains the context of generating one protocol. Everything that
+# used to be set as a module global before generating is part of the context,
+# and every thread uses its own current context, so several protocols can be
+# generated at the same time in one process.
+import contextlib
+import contextvars
+from collections import namedtuple
+
+# symbolIndex and scopesHaveCrossScopeLinks are filled in while the protocol's
+# structures are loaded, the caches of normalized scopes, interned conditionals
+# and event backend fragments as they are used, but the context itself never
+# changes. Everything cached for a protocol goes away with its context.
+GenerationContext = namedtuple("GenerationContext", ["protocolName", "usesLayer2", "customFieldTypes", "symbolIndex", "scopesHaveCrossScopeLinks", "normalizedScopes", "internedConditionals", "eventBackendFragments", "eventBackendUses"])
+
+def createContext(protocolName, usesLayer2=False, customFieldTypes=None):
+    return GenerationContext(protocolName, usesLayer2, customFieldTypes if customFieldTypes is not None else {}, {}, {}, {}, {}, {}, set())
+
+def createContextFromConfiguration(configuration):
+    return createContext(configuration.protocol, configuration.usesLayer2, configuration.customFieldTypes)
+
+# There is no default context, since generating with one that belongs to no
+# protocol would silently produce wrong names
+_currentContext = contextvars.ContextVar("generationContext", default=None)
+
+def current():
+    context = _currentContext.get()
+    if context is None:
+        raise RuntimeError("No generation context is set; call generation_context.setCurrent or use first")
+    return context
+
+def setCurrent(context):
+    # Makes context the current context of this thread from now on
+    return _currentContext.set(context)
+
+@contextlib.contextmanager
+def use(context):
+    # Makes context the current context of this thread until the block ends
+    token = setCurrent(context)
+    try:
+        yield context
+    finally:
+        _currentContext.reset(token)
+
+def bind(function):
+    # Threads do not start with the current context of the thread that created
+    # them, so functions run by a pool have to be bound to it. Every call runs
+    # in its own copy, since one copy can not be used by two threads at once.
+    context = contextvars.copy_context()
+    def runInContext(*args):
+        return context.copy().run(function, *args)
+    return runInContext
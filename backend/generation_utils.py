@@ -1,19 +1,100 @@
 import utils
+import generation_context
+import emitter
 import graphing
+import graph_cache
+import output_files
+import template_registry
+import concurrent.futures
+import contextvars
 import json
 import os
-from string import Template
+from xml.sax.saxutils import escape
 
 # Graph Theory Imports
 import rustworkx as rx
 
-def copyFile(source, destination):
-    with open(source, "r") as inputFile, open(destination, "w") as currentFile:
-        currentFile.write(inputFile.read())
+# Maximum number of paths the path calculation may walk inside of cycles
+DEFAULT_PATH_BUDGET = 1000000
+
+# Set while writeParserFiles runs so unchanged files are not rewritten. Every
+# protocol that is being generated has its own writer.
+_currentOutputWriter = contextvars.ContextVar("outputWriter", default=None)
+
+def _writeOutputFile(destination, contents):
+    outputWriter = _currentOutputWriter.get()
+    if outputWriter is not None:
+        outputWriter.write(destination, contents)
+    else:
+        with open(destination, "w") as currentFile:
+            currentFile.write(contents)
+
+def _reuseScopeFiles(group, scope):
+    # Returns the names of the scope's files when they can be kept from the
+    # previous run, otherwise records the files generated for the scope
+    outputWriter = _currentOutputWriter.get()
+    if outputWriter is None:
+        return None
+    groupName = "{0}:{1}".format(group, scope)
+    reusedFiles = outputWriter.reuseGroup(groupName)
+    if reusedFiles is None:
+        outputWriter.startGroup(groupName)
+        return None
+    return [os.path.basename(filePath) for filePath in reusedFiles]
+
+def _finishScopeFiles():
+    outputWriter = _currentOutputWriter.get()
+    if outputWriter is not None:
+        outputWriter.endGroup()
+
+def calculateScopeInputHashes(configuration, crossScopeItems, zeekTypes, objects, switches, bitfields, enums, entryPointScope, entryPointName):
+    context = generation_context.current()
+    # Hashes everything the files of each scope are generated from. That is the
+    # generator itself, the configuration, where every structure name is
+    # defined, the scope's structures and Zeek records, and the same for every
+    # scope it uses directly or indirectly.
+    generalHash = graph_cache.hashContents([
+        output_files.calculateGeneratorHash(),
+        context.protocolName,
+        context.usesLayer2,
+        configuration,
+        entryPointScope,
+        entryPointName,
+        [(kind, name, [scope for scope, _, _ in symbols]) for (kind, name), symbols in context.symbolIndex.items()]
+    ])
+
+    scopeNames = {}
+    ownHashes = {}
+    for scope in configuration.scopes:
+        scopeNames[utils.normalizedScope(scope, "object")] = scope
+        scopeNames[utils.normalizedScope(scope, "enum")] = scope
+        ownHashes[scope] = graph_cache.hashContents([
+            objects.get(utils.normalizedScope(scope, "object")),
+            switches.get(utils.normalizedScope(scope, "switch")),
+            bitfields.get(utils.normalizedScope(scope, "bitfield")),
+            enums.get(utils.normalizedScope(scope, "enum")),
+            zeekTypes.get(utils.normalizedScope(scope, ""))
+        ])
+
+    scopeHashes = {}
+    for scope in configuration.scopes:
+        usedScopes = [scope]
+        pending = [scope]
+        while len(pending) > 0:
+            currentScope = pending.pop()
+            for otherScope in crossScopeItems.get(utils.normalizedScope(currentScope, ""), {}):
+                otherScope = scopeNames.get(otherScope)
+                if otherScope is not None and otherScope not in usedScopes:
+                    usedScopes.append(otherScope)
+                    pending.append(otherScope)
+        scopeHashes[scope] = graph_cache.hashContents([generalHash] + sorted(ownHashes[usedScope] for usedScope in usedScopes))
+    return scopeHashes
+
+def copyFile(templateName, destination):
+    _writeOutputFile(destination, template_registry.getContents(templateName))
     
-def copyTemplateFile(source, data, destination):
-    with open(source, "r") as inputFile, open(destination, "w") as currentFile:
-        currentFile.write(Template(inputFile.read()).substitute(data))
+def copyTemplateFile(templateName, data, destination):
+    _writeOutputFile(destination, template_registry.getTemplate(templateName).substitute(data))
         
 def writeNodes(nodes, outFilePath):
     with open(outFilePath, "w") as outFile:
@@ -21,53 +102,138 @@ def writeNodes(nodes, outFilePath):
                 outFile.write(node + "\n")
                 
 def writeDataToFile(data, outFilePath):
-    with open(outFilePath, "w") as outFile:
-        outFile.write(data)
+    _writeOutputFile(outFilePath, data)
         
-def createAndUseGraphInformation(configuration, objects, switches, bitfields, enums, entryPointScope, entryPointName, entryPointKey):
+def analyzeGraph(configuration, objects, switches, bitfields, enums, entryPointScope, entryPointKey, enumerateCycles=False, pathBudget=DEFAULT_PATH_BUDGET, approximateOnPathExplosion=False, pathWorkers=1):
     ############################################################################
     # Load the structures as nodes
     ############################################################################
     graph, objectNodes, nodeInformation, nodeToIndex, indexToNode, connectionData = generateGraph(configuration, objects, switches, bitfields, enums)
     
     ############################################################################
-    # Create actual graph
+    # Analyze the graph
     ############################################################################
-        
+    graphInformation = {
+        "graph": graph,
+        "objectNodes": objectNodes,
+        "nodeInformation": nodeInformation,
+        "nodeToIndex": nodeToIndex,
+        "indexToNode": indexToNode,
+        "connectionData": connectionData,
+        "pathInformation": {}
+    }
+    if not _analyzePaths(graphInformation, objectNodes, entryPointScope, entryPointKey, enumerateCycles, pathBudget, approximateOnPathExplosion, pathWorkers):
+        return None
+    return graphInformation
+    
+def _analyzePaths(graphInformation, targetNodes, entryPointScope, entryPointKey, enumerateCycles, pathBudget, approximateOnPathExplosion, pathWorkers):
+    graph = graphInformation["graph"]
+    nodeToIndex = graphInformation["nodeToIndex"]
+    indexToNode = graphInformation["indexToNode"]
+    
+    # Make sure the path calculation will finish in a reasonable time
+    pathCounts, segmentCounts, nodeToComponent = estimatePathCounts(graph, entryPointKey, nodeToIndex, pathBudget)
+    approximatePaths = False
+    if sum(segmentCounts.values()) > pathBudget:
+        printPathWarnings(graph, pathCounts, segmentCounts, nodeToComponent, pathBudget)
+        if not approximateOnPathExplosion:
+            return False
+        print("Approximating logging parents inside of cycles")
+        approximatePaths = True
+    
     # Determine paths for every node from the EntryPoint Node
-    pathInformation = calculatePathInformation(graph, objectNodes, entryPointScope, entryPointKey, nodeInformation, nodeToIndex, indexToNode)
+    pathInformation = calculatePathInformation(graph, targetNodes, entryPointScope, entryPointKey, graphInformation["nodeInformation"], nodeToIndex, indexToNode, approximatePaths, pathWorkers)
+    graphInformation["pathInformation"].update(pathInformation)
     
     # Look for cycles in the graph
-    cycleIndices = rx.simple_cycles(graph)
-    cycles = []
-    for cycle in cycleIndices:
-        mappedCycle = []
-        for index in cycle:
-            mappedCycle.append(indexToNode[index])
-        cycles.append(mappedCycle)
+    if enumerateCycles:
+        cycles, cycleCount, cycleBreakingNodes = enumerateCycleInformation(graph, indexToNode)
+    else:
+        cycles, cycleCount, cycleBreakingNodes = calculateCycleInformation(graph)
+    graphInformation["cycles"] = cycles
+    graphInformation["cycleCount"] = cycleCount
+    graphInformation["cycleBreakingNodes"] = cycleBreakingNodes
     
     missingExpectedTopLevelNodes, expectedTopLevelNodes, unexpectedTopLevelNodes = determineTopLevelNodes(graph, [entryPointKey], indexToNode)
+    graphInformation["missingExpectedTopLevelNodes"] = missingExpectedTopLevelNodes
+    graphInformation["expectedTopLevelNodes"] = expectedTopLevelNodes
+    graphInformation["unexpectedTopLevelNodes"] = unexpectedTopLevelNodes
+    return True
+    
+def reanalyzeGraph(graphInformation, configuration, objects, switches, bitfields, enums, changedScopes, entryPointScope, entryPointKey, enumerateCycles=False, pathBudget=DEFAULT_PATH_BUDGET, approximateOnPathExplosion=False, pathWorkers=1):
+    # Patches a previously analyzed graph after some scopes changed and only
+    # recalculates the paths of objects that can be reached from those scopes
+    affectedNodes = updateGraph(graphInformation, configuration, objects, switches, bitfields, enums, changedScopes)
+    pathInformation = graphInformation["pathInformation"]
+    for targetScope, targetName in list(pathInformation):
+        if graphing.structureNode(targetScope, "object", targetName) not in graphInformation["nodeToIndex"]:
+            del pathInformation[(targetScope, targetName)]
+    targetNodes = [node for node in graphInformation["objectNodes"] if node in affectedNodes]
+    print("Recalculating paths for {} of {} objects".format(len(targetNodes), len(graphInformation["objectNodes"])))
+    if not _analyzePaths(graphInformation, targetNodes, entryPointScope, entryPointKey, enumerateCycles, pathBudget, approximateOnPathExplosion, pathWorkers):
+        return None
+    return graphInformation
+        
+def _loadOrAnalyzeGraph(cacheFolder, configuration, objects, switches, bitfields, enums, entryPointScope, entryPointKey, enumerateCycles, pathBudget, approximateOnPathExplosion, pathWorkers):
+    # The number of workers does not change the results, so it is not part of
+    # the cache key
+    analysisOptions = [enumerateCycles, pathBudget, approximateOnPathExplosion]
+    baseKey = graph_cache.calculateBaseKey(configuration, entryPointScope, entryPointKey, analysisOptions)
+    scopeHashes = graph_cache.calculateScopeHashes(configuration.scopes, objects, switches, bitfields, enums)
+    cacheKey = graph_cache.calculateCacheKey(baseKey, scopeHashes)
+    graphInformation = graph_cache.loadGraphInformation(cacheFolder, cacheKey)
+    if graphInformation is not None:
+        return graphInformation
+    
+    # Patch the graph from the last run if only some of the scopes changed
+    changedScopes = None
+    graphInformation = graph_cache.loadLatestGraphInformation(cacheFolder, baseKey)
+    if graphInformation is not None:
+        changedScopes = graph_cache.determineChangedScopes(graphInformation["scopeHashes"], scopeHashes)
+    if changedScopes is not None:
+        print("Updating cached graph information for scopes: {}".format(", ".join(changedScopes)))
+        graphInformation = reanalyzeGraph(graphInformation, configuration, objects, switches, bitfields, enums, changedScopes, entryPointScope, entryPointKey, enumerateCycles, pathBudget, approximateOnPathExplosion, pathWorkers)
+    else:
+        graphInformation = analyzeGraph(configuration, objects, switches, bitfields, enums, entryPointScope, entryPointKey, enumerateCycles, pathBudget, approximateOnPathExplosion, pathWorkers)
+    if graphInformation is None:
+        return None
+    graphInformation["scopeHashes"] = scopeHashes
+    graph_cache.storeGraphInformation(cacheFolder, baseKey, cacheKey, graphInformation)
+    return graphInformation
+        
+def createAndUseGraphInformation(configuration, objects, switches, bitfields, enums, entryPointScope, entryPointName, entryPointKey, enumerateCycles=False, pathBudget=DEFAULT_PATH_BUDGET, approximateOnPathExplosion=False, cacheFolder=None, pathWorkers=1, dumpFolder=None):
+    ############################################################################
+    # Analyze the graph, reusing the results of a previous run if possible
+    ############################################################################
+    if cacheFolder is not None:
+        graphInformation = _loadOrAnalyzeGraph(cacheFolder, configuration, objects, switches, bitfields, enums, entryPointScope, entryPointKey, enumerateCycles, pathBudget, approximateOnPathExplosion, pathWorkers)
+    else:
+        graphInformation = analyzeGraph(configuration, objects, switches, bitfields, enums, entryPointScope, entryPointKey, enumerateCycles, pathBudget, approximateOnPathExplosion, pathWorkers)
+    if graphInformation is None:
+        return False
     
     ############################################################################
     # Use the graph information
     ############################################################################
-    printGraphWarnings(cycles, missingExpectedTopLevelNodes, unexpectedTopLevelNodes)
+    printGraphWarnings(graphInformation["cycles"], graphInformation["cycleCount"], graphInformation["cycleBreakingNodes"], graphInformation["missingExpectedTopLevelNodes"], graphInformation["unexpectedTopLevelNodes"], enumerateCycles)
     ############################################################################
-    # This line outputs calculated graphing information to files.
-    # This takes a while so should only be run for debugging.
+    # Output the calculated graphing information to files for debugging
     ############################################################################
-    #saveGraphInformation(graph, pathInformation, cycles, missingExpectedTopLevelNodes, unexpectedTopLevelNodes)
+    if dumpFolder is not None:
+        saveGraphInformation(graphInformation, dumpFolder)
     
-    updateObjectsBasedOnGraphInformation(cycles, pathInformation, objects, entryPointScope, entryPointName)
+    updateObjectsBasedOnGraphInformation(graphInformation["cycleBreakingNodes"], graphInformation["pathInformation"], objects, entryPointScope, entryPointName)
+    return True
 
 def generateProtocolEvents(normalScope, entryPointScope, entryPointName, trasportProtos, usesLayer2=False):
+    context = generation_context.current()
     eventString = ""
     for protocol in trasportProtos:
-        eventString += "protocol analyzer spicy::{}_{} over {}:\n".format(utils.PROTOCOL_NAME.upper(), protocol, protocol)
+        eventString += "protocol analyzer spicy::{}_{} over {}:\n".format(context.protocolName.upper(), protocol, protocol)
         eventString += "{}parse with {}::{}".format(utils.SINGLE_TAB, normalScope, entryPointName + "s")
         eventString += ";\n\n"
     if usesLayer2:
-        eventString += "packet analyzer spicy::{}:\n".format(utils.PROTOCOL_NAME.upper())
+        eventString += "packet analyzer spicy::{}:\n".format(context.protocolName.upper())
         eventString += "{}parse with {}::{};".format(utils.SINGLE_TAB, normalScope, entryPointName + "s")
         eventString += "\n\n"
     return eventString
@@ -120,7 +286,7 @@ def _addObjectNodes(configuration, objects, nodeInformation, objectNodes, refere
             itemName = graphing.addItemNode(normalizedScope, currentObject,
                                    "object", nodeInformation, None,
                                    configuration.customFieldTypes.keys())
-            objectNodes.append(graphing.normalizedKey3(normalizedScope, "object", itemName))
+            objectNodes.append(graphing.structureNode(normalizedScope, "object", itemName))
             
             # Process the fields
             for field in currentObject.fields:
@@ -287,60 +453,411 @@ def generateGraph(configuration, objects, switches, bitfields, enums):
         connectionData[connectionID] = connection[2]
         
     return (graph, objectNodes, nodeInformation, nodeToIndex, indexToNode, connectionData)
+
+def findReachableStructures(configuration, objects, switches, bitfields, enums, entryPointKey):
+    # Returns the keys of every structure that can be reached from the
+    # EntryPoint Node through fields, references or dependencies
+    _, nodeInformation, fieldsInformation, referenceInformation = \
+        _addNodes(configuration, objects, switches, bitfields, enums)
+    dependencyNodeInformation = {}
+    dependencyReferenceInformation = []
+    dependencyInformation = []
+    _addObjectDependencyNodes(configuration, objects, dependencyNodeInformation, dependencyReferenceInformation, dependencyInformation)
+    _addSwitchDependencyNodes(configuration, switches, dependencyNodeInformation, dependencyReferenceInformation, dependencyInformation)
+
+    connections = {}
+    for connection in fieldsInformation + referenceInformation + dependencyInformation + dependencyReferenceInformation:
+        connections.setdefault(connection[0], []).append(connection[1])
+
+    reachableNodes = {entryPointKey}
+    pending = [entryPointKey]
+    while len(pending) > 0:
+        node = pending.pop()
+        for destination in connections.get(node, []):
+            if destination not in reachableNodes:
+                reachableNodes.add(destination)
+                pending.append(destination)
+    return reachableNodes
+
+def _pruneStructures(structures, structureType, reachableNodes, prunedStructures):
+    for normalizedScope in structures:
+        for structureName in list(structures[normalizedScope]):
+            itemName = graphing.getItemName(normalizedScope, structures[normalizedScope][structureName], structureType)
+            if graphing.structureNode(normalizedScope, structureType, itemName) not in reachableNodes:
+                del structures[normalizedScope][structureName]
+                prunedStructures.append(graphing.normalizedKey3(normalizedScope, structureType, itemName))
+
+def pruneUnreachableStructures(configuration, objects, switches, bitfields, enums, entryPointKey):
+    # Removes the structures that can not be reached from the EntryPoint so
+    # they are neither analyzed nor generated. The scopes themselves are kept,
+    # even when they end up empty.
+    reachableNodes = findReachableStructures(configuration, objects, switches, bitfields, enums, entryPointKey)
+    prunedStructures = []
+    _pruneStructures(objects, "object", reachableNodes, prunedStructures)
+    _pruneStructures(switches, "switch", reachableNodes, prunedStructures)
+    _pruneStructures(bitfields, "bits", reachableNodes, prunedStructures)
+    _pruneStructures(enums, "enum", reachableNodes, prunedStructures)
+    return prunedStructures
+
+def printPruneReport(prunedStructures):
+    print()
+    print("Pruned {} Structures Unreachable from the EntryPoint".format(len(prunedStructures)))
+    for key in prunedStructures:
+        print("{}{}".format(utils.SINGLE_TAB, key))
+    print()
+
+def _filterScopes(structures, normalizedScopes):
+    return {normalizedScope: structures[normalizedScope] for normalizedScope in structures if normalizedScope in normalizedScopes}
+
+def _findDescendants(graph, startNodes):
+    descendants = set(startNodes)
+    pending = list(startNodes)
+    while len(pending) > 0:
+        node = pending.pop()
+        for successor in graph.successor_indices(node):
+            if successor not in descendants:
+                descendants.add(successor)
+                pending.append(successor)
+    return descendants
+
+def updateGraph(graphInformation, configuration, objects, switches, bitfields, enums, changedScopes):
+    # Replaces the nodes and edges of the changed scopes in an existing graph.
+    # Returns the keys of every node whose paths may have changed.
+    graph = graphInformation["graph"]
+    nodeInformation = graphInformation["nodeInformation"]
+    nodeToIndex = graphInformation["nodeToIndex"]
+    indexToNode = graphInformation["indexToNode"]
+    connectionData = graphInformation["connectionData"]
+    normalizedScopes = set()
+    for scope in changedScopes:
+        normalizedScopes.add(utils.normalizedScope(scope, "object"))
+        normalizedScopes.add(utils.normalizedScope(scope, "enum"))
+
+    ############################################################################
+    # Remove the old nodes, remembering references into them from other scopes
+    ############################################################################
+    removedNodes = [index for index in graph.node_indices() if graph[index].scope in normalizedScopes]
+    affectedNodes = {graph[index] for index in _findDescendants(graph, removedNodes)}
+    externalReferences = []
+    for index in removedNodes:
+        for source, destination, _ in graph.in_edges(index):
+            if graph[source].scope not in normalizedScopes:
+                externalReferences.append((graph[source], graph[destination]))
+        for edgeIndex in graph.incident_edges(index, all_edges=True):
+            connectionData.pop(edgeIndex, None)
+    for index in removedNodes:
+        node = indexToNode.pop(index)
+        del nodeToIndex[node]
+        del nodeInformation[node]
+    graph.remove_nodes_from(removedNodes)
+    graphInformation["objectNodes"] = [node for node in graphInformation["objectNodes"] if node in nodeToIndex]
+
+    ############################################################################
+    # Add the new nodes and edges of the changed scopes
+    ############################################################################
+    addedNodeInformation = {}
+    objectNodes = []
+    referenceInformation = []
+    fieldsInformation = []
+    _addObjectNodes(configuration, _filterScopes(objects, normalizedScopes), addedNodeInformation, objectNodes, referenceInformation, fieldsInformation)
+    _addSwitchNodes(configuration, _filterScopes(switches, normalizedScopes), addedNodeInformation, referenceInformation, fieldsInformation)
+    _addBitfieldNodes(configuration, _filterScopes(bitfields, normalizedScopes), addedNodeInformation, referenceInformation, fieldsInformation)
+    _addEnumNodes(configuration, _filterScopes(enums, normalizedScopes), addedNodeInformation, referenceInformation, fieldsInformation)
     
-def _processPath(path, entryPointScope, targetScope, nodeInformation, indexToNode):
-    tempPath = []
-    for element in path:
-        tempPath.append(indexToNode[element])
-    loggingParent = None
-    parentReason = ""
-    previousScope = None
-    pathInfo = {}
-    for element in tempPath[::-1]:
-        parts = element.split(".")
-        if len(parts) < 3:
+    addedNodes = []
+    for node in addedNodeInformation:
+        nodeInformation[node] = addedNodeInformation[node]
+        if node not in nodeToIndex:
+            nodeIndex = graph.add_node(node)
+            nodeToIndex[node] = nodeIndex
+            indexToNode[nodeIndex] = node
+            addedNodes.append(nodeIndex)
+    graphInformation["objectNodes"].extend(objectNodes)
+    
+    for connection in fieldsInformation + referenceInformation:
+        connectionID = graph.add_edge(nodeToIndex[connection[0]], nodeToIndex[connection[1]], None)
+        connectionData[connectionID] = connection[2]
+        
+    for source, destination in externalReferences:
+        if destination not in nodeToIndex:
+            print("Unknown reference from {} to {}".format(graphing.reportKey(source), graphing.reportKey(destination)))
             continue
-        scope = parts[0]
-        referenceType = parts[2]
-        if scope != targetScope:
-            loggingParent = utils.loggingParentScope(previousScope)
-            parentReason = "Scope Change"
-            break
-        metaData = nodeInformation[element][1]
-        if metaData is not None:
-            if "logIndependently" in metaData and True == metaData["logIndependently"]:
-                loggingParent = referenceType
-                parentReason = "Log Independently"
-                break
-        previousScope = scope
-    pathInfo["path"] = tempPath
-    if loggingParent is None:
+        connectionID = graph.add_edge(nodeToIndex[source], nodeToIndex[destination], None)
+        connectionData[connectionID] = "reference"
+        
+    affectedNodes.update(graph[index] for index in _findDescendants(graph, addedNodes))
+    return affectedNodes
+    
+def _determineLoggingBoundary(identity, targetScope, nodeInformation):
+    # A path's logging parent is decided by the last node on it that either
+    # sits outside of the target's scope or is logged independently
+    if identity.scope is None:
+        return None
+    if identity.scope != targetScope:
+        return (utils.loggingParentScope(targetScope), "Scope Change")
+    metaData = nodeInformation[identity][1]
+    if metaData is not None:
+        if "logIndependently" in metaData and True == metaData["logIndependently"]:
+            return (identity.name, "Log Independently")
+    return None
+
+def _applyLoggingBoundary(states, boundary):
+    # states maps a logging parent to the first path (in rx.all_simple_paths
+    # order) that produces it
+    if boundary is None or len(states) == 0:
+        return states
+    return {boundary: min(states.values())}
+
+def _mergeLoggingStates(destination, states):
+    for value, path in states.items():
+        if value not in destination or path < destination[value]:
+            destination[value] = path
+
+def _extendLoggingStates(states, successorRank, successor):
+    step = ((successorRank, successor),)
+    return {value: path + step for value, path in states.items()}
+
+def _condenseGraph(graph):
+    components = rx.strongly_connected_components(graph)
+    nodeToComponent = {}
+    for componentIndex, component in enumerate(components):
+        for node in component:
+            nodeToComponent[node] = componentIndex
+    condensedGraph = rx.PyDiGraph(multigraph=False)
+    condensedGraph.add_nodes_from(range(len(components)))
+    for source, destination in graph.edge_list():
+        if nodeToComponent[source] != nodeToComponent[destination]:
+            condensedGraph.add_edge(nodeToComponent[source], nodeToComponent[destination], None)
+    order = [components[index] for index in rx.topological_sort(condensedGraph)]
+    return (order, nodeToComponent)
+
+def _collectIncomingStates(graph, node, component, nodeToComponent, states, successorRanks, entryPointIndex):
+    incoming = {}
+    if node == entryPointIndex:
+        incoming[None] = ()
+    for predecessor in graph.predecessor_indices(node):
+        if nodeToComponent[predecessor] == component or predecessor not in states:
+            continue
+        _mergeLoggingStates(incoming, _extendLoggingStates(states[predecessor], successorRanks[predecessor][node], node))
+    return incoming
+
+def _walkComponent(graph, startNode, startStates, component, nodeToComponent, states, successorRanks, boundaries):
+    # Simple paths may only pass through a strongly connected component once,
+    # so only the segment inside the component has to be enumerated. The walk
+    # keeps its own stack, since a segment can be as long as the component.
+    visited = {startNode}
+    # (node, logging states of the path to it, successors left to walk)
+    stack = [(startNode, startStates, iter(graph.successor_indices(startNode)))]
+    while len(stack) > 0:
+        node, currentStates, successors = stack[-1]
+        successor = next(successors, None)
+        if successor is None:
+            stack.pop()
+            visited.discard(node)
+            continue
+        if nodeToComponent[successor] != component or successor in visited:
+            continue
+        nextStates = _applyLoggingBoundary(_extendLoggingStates(currentStates, successorRanks[node][successor], successor), boundaries[successor])
+        _mergeLoggingStates(states.setdefault(successor, {}), nextStates)
+        visited.add(successor)
+        stack.append((successor, nextStates, iter(graph.successor_indices(successor))))
+
+def _approximateComponent(graph, segmentStarts, component, nodeToComponent, states, successorRanks, boundaries):
+    # Propagates logging parents along walks instead of simple paths. This is
+    # linear in the size of the component, but a parent that can only be
+    # reached by passing through a node twice is reported as well.
+    pending = []
+    for node, startStates in segmentStarts:
+        _mergeLoggingStates(states.setdefault(node, {}), startStates)
+        pending.append(node)
+    while len(pending) > 0:
+        node = pending.pop()
+        for successor in graph.successor_indices(node):
+            if nodeToComponent[successor] != component:
+                continue
+            nextStates = _applyLoggingBoundary(_extendLoggingStates(states[node], successorRanks[node][successor], successor), boundaries[successor])
+            successorStates = states.setdefault(successor, {})
+            newValues = [value for value in nextStates if value not in successorStates]
+            if len(newValues) > 0:
+                for value in newValues:
+                    successorStates[value] = nextStates[value]
+                pending.append(successor)
+
+def _calculateLoggingStates(graph, order, nodeToComponent, successorRanks, entryPointIndex, boundaries, approximate=False):
+    states = {}
+    for component in order:
+        componentIndex = nodeToComponent[component[0]]
+        if len(component) == 1 and not graph.has_edge(component[0], component[0]):
+            node = component[0]
+            incoming = _collectIncomingStates(graph, node, componentIndex, nodeToComponent, states, successorRanks, entryPointIndex)
+            if len(incoming) > 0:
+                states[node] = _applyLoggingBoundary(incoming, boundaries[node])
+            continue
+        segmentStarts = []
+        for node in component:
+            incoming = _collectIncomingStates(graph, node, componentIndex, nodeToComponent, states, successorRanks, entryPointIndex)
+            if len(incoming) > 0:
+                segmentStarts.append((node, _applyLoggingBoundary(incoming, boundaries[node])))
+        if approximate:
+            _approximateComponent(graph, segmentStarts, componentIndex, nodeToComponent, states, successorRanks, boundaries)
+            continue
+        for node, startStates in segmentStarts:
+            _mergeLoggingStates(states.setdefault(node, {}), startStates)
+            _walkComponent(graph, node, startStates, componentIndex, nodeToComponent, states, successorRanks, boundaries)
+    return states
+
+def _createPathInfo(value, path, entryPointScope, entryPointIndex, indexToNode):
+    pathInfo = {}
+    pathInfo["path"] = [graphing.reportKey(indexToNode[entryPointIndex])] + [graphing.reportKey(indexToNode[node]) for _, node in path]
+    if value is None:
         pathInfo["needsLoggingParent"] = False
         pathInfo["loggingParent"] = utils.loggingParentScope(entryPointScope)
     else:
         pathInfo["needsLoggingParent"] = True
-        pathInfo["loggingParent"] = loggingParent
-        pathInfo["reason"] = parentReason
-        
+        pathInfo["loggingParent"] = value[0]
+        pathInfo["reason"] = value[1]
     return pathInfo
     
-def calculatePathInformation(graph, objectNodes, entryPointScope, entryPointKey, nodeInformation, nodeToIndex, indexToNode):
-    # Determine paths for every node from the EntryPoint Node
-    pathInformation = {}
+def _isCountedNode(identity):
+    return identity.field is None and identity.type in ["object", "switch"]
+
+def _countComponentSegments(graph, startNode, component, nodeToComponent, budget):
+    # Counts the simple paths inside a component starting at startNode, giving
+    # up once the budget has been exceeded. Like _walkComponent, it keeps its
+    # own stack so long recursive chains can be counted.
+    visited = {startNode}
+    # [node, successors left to count, paths counted so far, budget of the node]
+    stack = [[startNode, iter(graph.successor_indices(startNode)), 1, budget]]
+    while True:
+        node, successors, count, nodeBudget = stack[-1]
+        successor = next(successors, None) if count <= nodeBudget else None
+        if successor is None:
+            stack.pop()
+            visited.discard(node)
+            if len(stack) == 0:
+                return count
+            stack[-1][2] += count
+            continue
+        if nodeToComponent[successor] != component or successor in visited:
+            continue
+        visited.add(successor)
+        stack.append([successor, iter(graph.successor_indices(successor)), 1, nodeBudget - count])
+
+def estimatePathCounts(graph, entryPointKey, nodeToIndex, pathBudget):
+    # Counts the simple paths from the EntryPoint Node. On the acyclic part of
+    # the graph this is exact; nodes inside a cycle are estimated by the paths
+    # entering the cycle times the paths that have to be walked inside of it,
+    # which is also the work the exact path calculation would do.
+    entryPointIndex = nodeToIndex[entryPointKey]
+    order, nodeToComponent = _condenseGraph(graph)
+    pathCounts = {}
+    segmentCounts = {}
+    for component in order:
+        componentIndex = nodeToComponent[component[0]]
+        incoming = {}
+        for node in component:
+            count = 1 if node == entryPointIndex else 0
+            for predecessor in graph.predecessor_indices(node):
+                if nodeToComponent[predecessor] != componentIndex:
+                    count += pathCounts.get(predecessor, 0)
+            if count > 0:
+                incoming[node] = count
+        if len(incoming) == 0:
+            continue
+        if len(component) == 1 and not graph.has_edge(component[0], component[0]):
+            pathCounts[component[0]] = incoming[component[0]]
+            continue
+        segments = 0
+        for node in incoming:
+            segments += _countComponentSegments(graph, node, componentIndex, nodeToComponent, pathBudget - segments)
+            if segments > pathBudget:
+                break
+        segmentCounts[componentIndex] = segments
+        for node in component:
+            pathCounts[node] = sum(incoming.values()) * segments
+    return (pathCounts, segmentCounts, nodeToComponent)
+
+def printPathWarnings(graph, pathCounts, segmentCounts, nodeToComponent, pathBudget, reportLimit=10):
+    # Lists the objects and switches inside of cycles that are reached by the
+    # most paths
+    print()
+    print("Warning: Path analysis would walk more than {} paths inside of cycles".format(pathBudget))
+    print("Objects and switches causing the most paths:")
+    culprits = []
+    for node, count in pathCounts.items():
+        if nodeToComponent[node] in segmentCounts and _isCountedNode(graph[node]):
+            culprits.append((count, graphing.reportKey(graph[node])))
+    culprits.sort(key=lambda item: (-item[0], item[1]))
+    for count, node in culprits[:reportLimit]:
+        print("{}{} ({} paths)".format(utils.SINGLE_TAB, node, count))
+    print()
+    
+# Shared with the path workers once through the pool initializer so the graph
+# is not sent again for every target scope
+_pathWorkerState = None
+
+def _initializePathWorker(protocolName, graph, order, nodeToComponent, successorRanks, entryPointIndex, nodeInformation, approximate):
+    global _pathWorkerState
+    # Logging boundaries only need the protocol name from the context
+    generation_context.setCurrent(generation_context.createContext(protocolName))
+    _pathWorkerState = (graph, order, nodeToComponent, successorRanks, entryPointIndex, nodeInformation, approximate)
+
+def _calculateScopeLoggingStates(targetScope, targetIndices):
+    return _calculateScopeLoggingStatesFrom(_pathWorkerState, targetScope, targetIndices)
+
+def _calculateScopeLoggingStatesFrom(workerState, targetScope, targetIndices):
+    graph, order, nodeToComponent, successorRanks, entryPointIndex, nodeInformation, approximate = workerState
+    boundaries = {}
+    for node in graph.node_indices():
+        boundaries[node] = _determineLoggingBoundary(graph[node], targetScope, nodeInformation)
+    states = _calculateLoggingStates(graph, order, nodeToComponent, successorRanks, entryPointIndex, boundaries, approximate)
+    targetStates = {}
+    for node in targetIndices:
+        targetStates[node] = sorted(states.get(node, {}).items(), key=lambda item: item[1])
+    return targetStates
+
+def calculatePathInformation(graph, objectNodes, entryPointScope, entryPointKey, nodeInformation, nodeToIndex, indexToNode, approximate=False, workers=1):
+    # Determine the distinct logging parents of every node from the EntryPoint
+    # Node. Rather than enumerating every simple path, the logging parents are
+    # propagated forward over the condensed graph once per target scope. Each
+    # logging parent keeps the first path that produced it, so the results are
+    # listed in the same order rx.all_simple_paths would have found them.
+    entryPointIndex = nodeToIndex[entryPointKey]
+    order, nodeToComponent = _condenseGraph(graph)
+    successorRanks = {}
+    for node in graph.node_indices():
+        successorRanks[node] = {successor: rank for rank, successor in enumerate(graph.successor_indices(node))}
+
+    targetsByScope = {}
     for node in objectNodes:
         if node == entryPointKey:
             continue
-        paths = []
-        targetParts = node.split(".")
-        if len(targetParts) < 3:
-            print("Bad Path Value '{0}'".format(node))
+        identity = graph[nodeToIndex[node]]
+        if identity.scope is None:
+            print("Bad Path Value '{0}'".format(graphing.reportKey(node)))
             continue
-        targetScope = targetParts[0]
-        targetType = targetParts[1]
-        targetName = targetParts[2]
-        for path in rx.all_simple_paths(graph, nodeToIndex[entryPointKey], nodeToIndex[node]):
-            paths.append(_processPath(path, entryPointScope, targetScope, nodeInformation, indexToNode))
-        pathInformation["{0}::{1}".format(targetScope, targetName)] = paths
+        targetsByScope.setdefault(identity.scope, []).append((node, identity.name))
+
+    # The target scopes are independent of each other, so they can be spread
+    # over several processes. The results are collected in scope order either
+    # way to keep the output deterministic.
+    workerState = (graph, order, nodeToComponent, successorRanks, entryPointIndex, nodeInformation, approximate)
+    targetIndices = {targetScope: [nodeToIndex[node] for node, _ in targetsByScope[targetScope]] for targetScope in targetsByScope}
+    if workers > 1 and len(targetsByScope) > 1:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=min(workers, len(targetsByScope)), initializer=_initializePathWorker, initargs=(generation_context.current().protocolName,) + workerState) as executor:
+            scopeStates = dict(zip(targetsByScope, executor.map(_calculateScopeLoggingStates, targetsByScope, targetIndices.values())))
+    else:
+        # Without the global worker state, so several graphs can be analyzed
+        # at the same time
+        scopeStates = {targetScope: _calculateScopeLoggingStatesFrom(workerState, targetScope, targetIndices[targetScope]) for targetScope in targetsByScope}
+
+    pathInformation = {}
+    for targetScope in targetsByScope:
+        for node, targetName in targetsByScope[targetScope]:
+            paths = []
+            for value, path in scopeStates[targetScope][nodeToIndex[node]]:
+                paths.append(_createPathInfo(value, path, entryPointScope, entryPointIndex, indexToNode))
+            pathInformation[(targetScope, targetName)] = paths
     return pathInformation
     
 def determineTopLevelNodes(graph, expectedTopLevelNodes, indexToNode):
@@ -356,12 +873,106 @@ def determineTopLevelNodes(graph, expectedTopLevelNodes, indexToNode):
     for node in expectedTopLevelNodes:
         if node not in expectedNodes:
             missingNodes.append(node)
-    return (missingNodes, expectedNodes, unexpectedNodes)
+    # Only reported, so they are kept in their dotted form
+    return ([graphing.reportKey(node) for node in missingNodes], [graphing.reportKey(node) for node in expectedNodes], [graphing.reportKey(node) for node in unexpectedNodes])
+    
+def _isObjectNode(identity):
+    return "object" == identity.type
+
+def _isCyclicComponent(graph, component):
+    return len(component) > 1 or graph.has_edge(component[0], component[0])
+
+def _selectCycleBreakingNode(graph, component):
+    # Prefer the object that sits on the most cycles, approximated by the
+    # number of edges passing through it
+    selectedNode = None
+    selectedScore = None
+    for node in component:
+        if not _isObjectNode(graph[node]):
+            continue
+        score = (graph.in_degree(node) * graph.out_degree(node), graphing.reportKey(graph[node]))
+        if selectedScore is None or score[0] > selectedScore[0] or (score[0] == selectedScore[0] and score[1] < selectedScore[1]):
+            selectedNode = node
+            selectedScore = score
+    return selectedNode
+
+def _isAcyclicWithout(graph, removedNodes):
+    remainingGraph = graph.copy()
+    remainingGraph.remove_nodes_from(list(removedNodes))
+    return rx.is_directed_acyclic_graph(remainingGraph)
+
+def _findCycleBreakingNodes(componentGraph):
+    # Greedily remove objects until the component is acyclic, then drop any
+    # object that is not needed so the resulting feedback set is minimal
+    workingGraph = componentGraph.copy()
+    selectedNodes = []
+    unbreakableComponents = []
+    while True:
+        cyclicComponents = [component for component in rx.strongly_connected_components(workingGraph) if _isCyclicComponent(workingGraph, component)]
+        if len(cyclicComponents) == 0:
+            break
+        for component in cyclicComponents:
+            node = _selectCycleBreakingNode(workingGraph, component)
+            if node is None:
+                unbreakableComponents.append([graphing.reportKey(workingGraph[index]) for index in component])
+                workingGraph.remove_nodes_from(component)
+            else:
+                selectedNodes.append(node)
+                workingGraph.remove_node(node)
+    if len(unbreakableComponents) == 0:
+        for node in selectedNodes[::-1]:
+            remainingNodes = [selectedNode for selectedNode in selectedNodes if selectedNode != node]
+            if _isAcyclicWithout(componentGraph, remainingNodes):
+                selectedNodes = remainingNodes
+    return ([componentGraph[node] for node in selectedNodes], unbreakableComponents)
+
+def calculateCycleInformation(graph):
+    # Work on the strongly connected components instead of every elementary
+    # cycle. Each cyclic component reports one representative cycle, counts
+    # its independent cycles (edges - nodes + 1) and provides a minimal set of
+    # objects that breaks all of its cycles.
+    cycles = []
+    cycleCount = 0
+    cycleBreakingNodes = []
+    for component in rx.strongly_connected_components(graph):
+        if not _isCyclicComponent(graph, component):
+            continue
+        componentGraph = graph.subgraph(sorted(component))
+        cycleCount += componentGraph.num_edges() - componentGraph.num_nodes() + 1
+        cycles.append([graphing.reportKey(componentGraph[source]) for source, _ in rx.digraph_find_cycle(componentGraph, 0)])
+        breakingNodes, unbreakableComponents = _findCycleBreakingNodes(componentGraph)
+        cycleBreakingNodes.extend(breakingNodes)
+        for unbreakableComponent in unbreakableComponents:
+            print("Unable to process cycle: {}".format(" -> ".join(unbreakableComponent)))
+    return (cycles, cycleCount, cycleBreakingNodes)
+
+def enumerateCycleInformation(graph, indexToNode):
+    # Lists every elementary cycle; only practical for small graphs
+    cycles = []
+    cycleBreakingNodes = []
+    for cycle in rx.simple_cycles(graph):
+        mappedCycle = []
+        for index in cycle:
+            mappedCycle.append(graphing.reportKey(indexToNode[index]))
+        cycles.append(mappedCycle)
+        cycleBreakingNode = next((graph[index] for index in cycle if _isObjectNode(graph[index])), None)
+        if cycleBreakingNode is None:
+            print("Unable to process cycle: {}".format(" -> ".join(mappedCycle)))
+        elif cycleBreakingNode not in cycleBreakingNodes:
+            cycleBreakingNodes.append(cycleBreakingNode)
+    return (cycles, len(cycles), cycleBreakingNodes)
     
-def printGraphWarnings(cycles, missingTopLevelNodes, unexpectedTopLevelNodes):
+def printGraphWarnings(cycles, cycleCount, cycleBreakingNodes, missingTopLevelNodes, unexpectedTopLevelNodes, enumeratedCycles=False):
     if len(cycles) > 0:
          print()
-         print("Warning: {} Cycles Found".format(len(cycles)))
+         # Without enumerating, the count is the number of independent cycles
+         # (edges - nodes + 1 of every cyclic component), which is usually far
+         # lower than the number of elementary cycles
+         if enumeratedCycles:
+             print("Warning: {} Cycles Found".format(cycleCount))
+         else:
+             print("Warning: {} Independent Cycles Found".format(cycleCount))
+         print("{} Objects Marked to Break Cycles".format(len(cycleBreakingNodes)))
          print()
          
          # Iterate over all cycles
@@ -390,50 +1001,79 @@ def printGraphWarnings(cycles, missingTopLevelNodes, unexpectedTopLevelNodes):
         print("Warning: {} Unexpected Top Level Nodes Found".format(len(unexpectedTopLevelNodes)))
         print()
     
-def saveGraphInformation(graph, pathInformation, cycles, missingExpectedTopLevelNodes, unexpectedTopLevelNodes):
-    writeDataToFile(json.dumps(pathInformation, indent=4), "paths.json")
+def writeJsonLines(records, outFilePath):
+    # Serializes one record at a time so the whole file never has to be held
+    # in memory
+    with open(outFilePath, "w") as outFile:
+        for record in records:
+            outFile.write(json.dumps(record) + "\n")
+
+def _pathRecords(pathInformation):
+    for target, paths in pathInformation.items():
+        for path in paths:
+            record = {"target": "{0}::{1}".format(*target)}
+            record.update(path)
+            yield record
+
+def writeGraphDot(graph, nodeInformation, connectionData, outFilePath):
+    with open(outFilePath, "w") as outFile:
+        outFile.write("digraph {\n")
+        for node in graph.node_indices():
+            # The node labels are already quoted
+            outFile.write("{} [label={}];\n".format(node, nodeInformation[graph[node]][0]))
+        for edge in graph.edge_indices():
+            source, destination = graph.get_edge_endpoints_by_index(edge)
+            outFile.write("{} -> {} [label=\"{}\"];\n".format(source, destination, connectionData[edge]))
+        outFile.write("}\n")
+
+def writeGraphML(graph, nodeInformation, connectionData, outFilePath):
+    with open(outFilePath, "w") as outFile:
+        outFile.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        outFile.write('<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n')
+        outFile.write('<key id="key" for="node" attr.name="key" attr.type="string"/>\n')
+        outFile.write('<key id="label" for="node" attr.name="label" attr.type="string"/>\n')
+        outFile.write('<key id="connection" for="edge" attr.name="connection" attr.type="string"/>\n')
+        outFile.write('<graph edgedefault="directed">\n')
+        for node in graph.node_indices():
+            outFile.write('<node id="n{}"><data key="key">{}</data><data key="label">{}</data></node>\n'.format(
+                node, escape(graphing.reportKey(graph[node])), escape(nodeInformation[graph[node]][0].strip('"'))))
+        for edge in graph.edge_indices():
+            source, destination = graph.get_edge_endpoints_by_index(edge)
+            outFile.write('<edge source="n{}" target="n{}"><data key="connection">{}</data></edge>\n'.format(
+                source, destination, escape(connectionData[edge])))
+        outFile.write("</graph>\n")
+        outFile.write("</graphml>\n")
+
+def saveGraphInformation(graphInformation, outputFolder):
+    os.makedirs(outputFolder, exist_ok=True)
+    writeJsonLines(_pathRecords(graphInformation["pathInformation"]), os.path.join(outputFolder, "paths.jsonl"))
         
-    if len(cycles) > 0:
-        cycleString = ""
-        for cycle in cycles:
-            for index, node in enumerate(cycle):
-                cycleString = cycleString + node
-                if index < len(cycle) - 1:
-                    cycleString += " -> "
-            cycleString += "\n"
-        writeDataToFile(cycleString, "cycles.txt"); 
-    if 0 != len(missingExpectedTopLevelNodes):
-        writeNodes(missingExpectedTopLevelNodes, "missing_expected_nodes.txt")
+    if len(graphInformation["cycles"]) > 0:
+        writeJsonLines(graphInformation["cycles"], os.path.join(outputFolder, "cycles.jsonl"))
+    if 0 != len(graphInformation["missingExpectedTopLevelNodes"]):
+        writeNodes(graphInformation["missingExpectedTopLevelNodes"], os.path.join(outputFolder, "missing_expected_nodes.txt"))
         
-    if 0 != len(unexpectedTopLevelNodes):
-        writeNodes(unexpectedTopLevelNodes, "unexpected_top_nodes.txt")
+    if 0 != len(graphInformation["unexpectedTopLevelNodes"]):
+        writeNodes(graphInformation["unexpectedTopLevelNodes"], os.path.join(outputFolder, "unexpected_top_nodes.txt"))
 
-    # TODO: Update these to work with rustworkx
-    #dotGraph = nx.nx_pydot.to_pydot(graph)
-    #dotGraph.write_svg("output_no_dependencies.svg")
+    writeGraphDot(graphInformation["graph"], graphInformation["nodeInformation"], graphInformation["connectionData"], os.path.join(outputFolder, "graph.dot"))
+    writeGraphML(graphInformation["graph"], graphInformation["nodeInformation"], graphInformation["connectionData"], os.path.join(outputFolder, "graph.graphml"))
+    print("Graph information written to {0}".format(outputFolder))
     
-def updateObjectsBasedOnGraphInformation(cycles, pathInformation, objects, entryPointScope, entryPointName):
+def updateObjectsBasedOnGraphInformation(cycleBreakingNodes, pathInformation, objects, entryPointScope, entryPointName):
     # Deal with cycles    
-    for cycle in cycles:
-        takenCareOf = False
-        for item in cycle:
-            cycleParts = item.split(".")
-            if "object" == cycleParts[1]:
-                try:
-                    objects[cycleParts[0]][cycleParts[2]].needsSpecificExport = True
-                    takenCareOf = True
-                    break
-                except KeyError:
-                    print("Unknown cycle object: {}".format(item))
-        if not takenCareOf:
-            print("Unable to process cycl")
+    for item in cycleBreakingNodes:
+        try:
+            objects[item.scope][item.name].needsSpecificExport = True
+        except KeyError:
+            print("Unknown cycle object: {}".format(graphing.reportKey(item)))
             
     for normalizedScope in objects:
         for objectName in objects[normalizedScope]:
             if objectName == entryPointName:
                 objects[normalizedScope][objectName].zeekStructure.append(entryPointScope)
                 continue
-            for path in pathInformation["{}::{}".format(normalizedScope,objectName)]:
+            for path in pathInformation[(normalizedScope, objectName)]:
                 if "loggingParent" in path:
                     objects[normalizedScope][objectName].zeekStructure.append(path["loggingParent"])
                     
@@ -471,7 +1111,7 @@ def determineInterScopeDependencies(configuration, bitfields, objects, switches)
                         if "custom" not in crossScopeItems[normalScope][normalConversionScope]:
                             crossScopeItems[normalScope][normalConversionScope]["custom"] = set()
                 #if  currentObject.needsSpecificExport and currentObject.logWithParent:
-                    #for path in pathInformation["{}::{}".format(utils.normalizedScope(scope, "object"),currentObject.name)]:
+                    #for path in pathInformation[(utils.normalizedScope(scope, "object"), currentObject.name)]:
                         #print(path)
         if normalScope in switches:
             print("Processing switches in scope: {0}".format(normalScope))
@@ -493,23 +1133,23 @@ def writeBasicFiles(configuration, outRootFolder):
         writeDataToFile(configuration.gitignoreFile,
                         os.path.join(outRootFolder, ".gitignore"))
     else:
-        copyFile(os.path.join("templates", "gitignore.in"),
+        copyFile("gitignore.in",
                  os.path.join(outRootFolder, ".gitignore"))
 
     # README
     data = {
-        "protocolName": utils.PROTOCOL_NAME,
+        "protocolName": generation_context.current().protocolName,
         "protocolDescription": configuration.longDescription,
         "outputFolder": os.path.basename(os.path.normpath(outRootFolder))
     }
 
-    copyTemplateFile(os.path.join("templates", "README.md.in"), data,
+    copyTemplateFile("README.md.in", data,
                      os.path.join(outRootFolder, "README.md"))
         
 def writeCMakeFiles(outRootFolder):
     # Create root CMakeLists.txt file    
-    data = {"protocol": utils.PROTOCOL_NAME}
-    copyTemplateFile(os.path.join("templates", "root_CMakeLists.txt.in"),
+    data = {"protocol": generation_context.current().protocolName}
+    copyTemplateFile("root_CMakeLists.txt.in",
                      data,
                      os.path.join(outRootFolder, "CMakeLists.txt"))
         
@@ -517,10 +1157,11 @@ def writeCMakeFiles(outRootFolder):
     cmakeFolder = os.path.join(outRootFolder, "cmake")
     os.makedirs(cmakeFolder, exist_ok=True)
 
-    copyFile(os.path.join("templates", "FindSpicyPlugin.cmake.in"),
+    copyFile("FindSpicyPlugin.cmake.in",
              os.path.join(cmakeFolder, "FindSpicyPlugin.cmake"))
 
 def writeTestFiles(outRootFolder):
+    context = generation_context.current()
     # Create test folder contents
     testingFolder = os.path.join(outRootFolder, "testing")
     os.makedirs(testingFolder, exist_ok=True)
@@ -533,30 +1174,31 @@ def writeTestFiles(outRootFolder):
     tracesFolder = os.path.join(testingFolder, "traces")
     os.makedirs(tracesFolder, exist_ok=True)
 
-    copyFile(os.path.join("templates", "btest.cfg.in"),
+    copyFile("btest.cfg.in",
              os.path.join(testingFolder, "btest.cfg"))
     
     data = {
-        "protocolName": utils.PROTOCOL_NAME,
-        "protocolNameUpper": utils.PROTOCOL_NAME.upper()
+        "protocolName": context.protocolName,
+        "protocolNameUpper": context.protocolName.upper()
     }
     
-    copyTemplateFile(os.path.join("templates", "availability.zeek.in"),
+    copyTemplateFile("availability.zeek.in",
                      data,
                      os.path.join(testsFolder, "availability.zeek"))
 
-    copyFile(os.path.join("templates", "diff-remove-timestamps.in"),
+    copyFile("diff-remove-timestamps.in",
              os.path.join(scriptsFolder, "diff-remove-timestamps"))
     
-    copyFile(os.path.join("templates", "get-zeek-env.in"),
+    copyFile("get-zeek-env.in",
              os.path.join(scriptsFolder, "get-zeek-env"))
 
-    copyFile(os.path.join("templates", "random.seed.in"),
+    copyFile("random.seed.in",
              os.path.join(filesFolder, "random.seed"))
 
 def writePackagingFiles(configuration, outRootFolder):
+    context = generation_context.current()
     # Function to write out zkg.meta file
-    if not utils.USES_LAYER_2:
+    if not context.usesLayer2:
         analyzerType = "protocol"
         if configuration.usesTCP and configuration.usesUDP:
             transportProtocolInformation = "\ntransport = IP"
@@ -575,31 +1217,32 @@ def writePackagingFiles(configuration, outRootFolder):
     data = {
         "analyzerType": analyzerType,
         "transportProtocolInformation": transportProtocolInformation,
-        "protocolName": utils.PROTOCOL_NAME,
+        "protocolName": context.protocolName,
         "protocolSummary": configuration.shortDescription.replace("\n", "\n    "),
         "protocolDescription": configuration.longDescription.replace("\n", "\n    "),
         "entryPoint": entryPoint,
-        "protocolNameUpper": utils.PROTOCOL_NAME.upper()
+        "protocolNameUpper": context.protocolName.upper()
     }
-    copyTemplateFile(os.path.join("templates", "zkg.meta.in"),
+    copyTemplateFile("zkg.meta.in",
                     data,
                     os.path.join(outRootFolder, "zkg.meta"))
     
 
     #data = {
-    #    "protocolName": utils.PROTOCOL_NAME,
-    #    "protocolNameLower": utils.PROTOCOL_NAME.lower(),
+    #    "protocolName": context.protocolName,
+    #    "protocolNameLower": context.protocolName.lower(),
     #    "scope": utils.normalizedScope(entryPointScope, "object"),
     #    "entryPointName": entryPointName
     #}
     #
-    #copyTemplateFile(os.path.join("templates", "standalone.spicy.in"),
+    #copyTemplateFile("standalone.spicy.in",
     #                 data,
     #                 os.path.join(testsFolder, "standalone.spicy"))
 
     # TODO: Deal with trace tests?
     
 def _writeCoreZeekFiles(configuration, scriptsFolder, zeekMainFileObject, allEnums):
+    context = generation_context.current()
     coreFiles = []
     coreFiles.append("__load__.zeek")
     sigsString = ""
@@ -627,16 +1270,16 @@ def _writeCoreZeekFiles(configuration, scriptsFolder, zeekMainFileObject, allEnu
         "typesString": typesString,
         "processingString": processingString
     }
-    copyTemplateFile(os.path.join("templates", "__load__.zeek.in"), data,
+    copyTemplateFile("__load__.zeek.in", data,
                      os.path.join(scriptsFolder, "__load__.zeek"))
 
     coreFiles.append("main.zeek")
     data = {
-        "protocolName": utils.PROTOCOL_NAME.upper(),
-        "mainContents": zeekMainFileObject.generateMainFile(utils.USES_LAYER_2, configuration),
+        "protocolName": context.protocolName.upper(),
+        "mainContents": zeekMainFileObject.generateMainFile(context.usesLayer2, configuration),
         "loggingFunctions": zeekMainFileObject.addLoggingFunction()
     }
-    copyTemplateFile(os.path.join("templates", "main.zeek.in"), data,
+    copyTemplateFile("main.zeek.in", data,
                      os.path.join(scriptsFolder, "main.zeek"))
         
     if configuration.signatureFile is not None:
@@ -645,71 +1288,81 @@ def _writeCoreZeekFiles(configuration, scriptsFolder, zeekMainFileObject, allEnu
     return coreFiles
     
 def _writeZeekTypeFiles(scriptsFolder, normalScope, zeekObjects):
-    contentString = ""
+    contents = emitter.Emitter()
     for zeekLog in zeekObjects.values():
-        # Is this creating the side effects?
-        contentString += zeekLog.createRecord()
+        contents.write(zeekLog.createRecord())
     data = {
         "scope": normalScope,
-        "contents": contentString
+        "contents": contents.getValue()
     }
     zeekTypesFileName = normalScope.lower() + "_types.zeek"
-    copyTemplateFile(os.path.join("templates", "zeek_types.zeek.in"), data,
+    copyTemplateFile("zeek_types.zeek.in", data,
                      os.path.join(scriptsFolder, zeekTypesFileName))
     return [zeekTypesFileName]
     
 def _writeZeekProcessingFiles(scriptsFolder, normalScope, zeekObjects, enums, bitfields, objects, switches, configuration):
-    eventString = ""
-    functionString = ""
+    events = emitter.Emitter()
+    functions = emitter.Emitter()
     for zeekLog in zeekObjects.values():
-        eventString += zeekLog.addHook()
-        functionString += "{0}\n".format(zeekLog.addFunctions(normalScope, enums, bitfields, objects, switches, configuration.scopes))
+        events.write(zeekLog.addHook())
+        functions.write(zeekLog.addFunctions(normalScope, enums, bitfields, objects, switches, configuration.scopes))
+        functions.write("\n")
     data = {
         "scope": normalScope,
-        "eventString": eventString,
-        "functionString": functionString
+        "eventString": events.getValue(),
+        "functionString": functions.getValue()
     }
     zeekProcessingFileName = normalScope.lower() + "_processing.zeek"
-    copyTemplateFile(os.path.join("templates", "zeek_processing.zeek.in"), data,
+    copyTemplateFile("zeek_processing.zeek.in", data,
                      os.path.join(scriptsFolder, zeekProcessingFileName))
     return [zeekProcessingFileName]
     
 def _writeZeekEnumFiles(scriptsFolder, scope, normalScope, enums):
     enumScope = utils.normalizedScope(scope, "enum")
     if enumScope in enums:
-        contents = ""
+        contents = emitter.Emitter()
         for currentEnumName in enums[enumScope]:
-            contents += enums[enumScope][currentEnumName].createZeekEnumString(enumScope)
+            contents.write(enums[enumScope][currentEnumName].createZeekEnumString(enumScope))
         data = {
             "scope": enumScope,
-            "contents": contents
+            "contents": contents.getValue()
         }
         zeekEnumFile = normalScope.lower() + "_enum.zeek"
-        copyTemplateFile(os.path.join("templates", "zeek_enum.zeek.in"),
+        copyTemplateFile("zeek_enum.zeek.in",
                          data,
                          os.path.join(scriptsFolder, zeekEnumFile))
         return [zeekEnumFile]
     else:
         return []
 
-# This is creating side effects somewhere...    
-def writeZeekFiles(configuration, outRootFolder, zeekTypes, zeekMainFileObject, bitfields, enums, objects, switches):
+def _writeZeekScopeFiles(scriptsFolder, configuration, scope, zeekTypes, bitfields, enums, objects, switches):
+    reusedFiles = _reuseScopeFiles("zeek", scope)
+    if reusedFiles is not None:
+        return reusedFiles
+
+    normalScope = utils.normalizedScope(scope, "")
+    zeekObjects = zeekTypes[normalScope]
+
+    scriptFiles = _writeZeekTypeFiles(scriptsFolder, normalScope, zeekObjects)
+
+    scriptFiles += _writeZeekProcessingFiles(scriptsFolder, normalScope, zeekObjects, enums, bitfields, objects, switches, configuration)
+    
+    scriptFiles += _writeZeekEnumFiles(scriptsFolder, scope, normalScope, enums)
+    _finishScopeFiles()
+    return scriptFiles
+
+def writeZeekFiles(configuration, outRootFolder, zeekTypes, zeekMainFileObject, bitfields, enums, objects, switches, workers=None):
     # Create basic zeek files 
     scriptsFolder = os.path.join(outRootFolder, "scripts")
     os.makedirs(scriptsFolder, exist_ok=True)
     
     scriptFiles = _writeCoreZeekFiles(configuration, scriptsFolder, zeekMainFileObject, enums)
     
-    # Create all the other files
-    for scope in configuration.scopes:
-        normalScope = utils.normalizedScope(scope, "")
-        zeekObjects = zeekTypes[normalScope]
-
-        scriptFiles += _writeZeekTypeFiles(scriptsFolder, normalScope, zeekObjects)
-
-        scriptFiles += _writeZeekProcessingFiles(scriptsFolder, normalScope, zeekObjects, enums, bitfields, objects, switches, configuration)
-        
-        scriptFiles += _writeZeekEnumFiles(scriptsFolder, scope, normalScope, enums)
+    # Create all the other files. Generating them does not change any structure,
+    # so the scopes are written in parallel and listed in the configured order.
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        for scopeFiles in executor.map(generation_context.bind(lambda scope: _writeZeekScopeFiles(scriptsFolder, configuration, scope, zeekTypes, bitfields, enums, objects, switches)), configuration.scopes):
+            scriptFiles += scopeFiles
             
     return scriptFiles
     
@@ -739,15 +1392,16 @@ def generateBaseSpicyConversionFunctions(configuration, scope):
     return returnString
     
 def _writeSpicyConfirmationFiles(analyzerFolder, entryPointName):
-    zeekConfirmationFile = "zeek_{}.spicy".format(utils.PROTOCOL_NAME.lower())
+    context = generation_context.current()
+    zeekConfirmationFile = "zeek_{}.spicy".format(context.protocolName.lower())
     data = {
         "entryPoint": entryPointName + "s",
-        "protocolName": utils.PROTOCOL_NAME,
+        "protocolName": context.protocolName,
         "scope": utils.normalizedScope(utils.DEFAULT_SCOPE, ""),
         "tab": utils.SINGLE_TAB
     }
     
-    copyTemplateFile(os.path.join("templates", "zeekConfirmationFile.spicy.in"),
+    copyTemplateFile("zeekConfirmationFile.spicy.in",
                      data,
                      os.path.join(analyzerFolder, zeekConfirmationFile))
                      
@@ -762,7 +1416,7 @@ def _writeConversionFiles(analyzerFolder, configuration):
         "scope": normalScope,
         "functions": generateBaseSpicyConversionFunctions(configuration, normalScope)
     }
-    copyTemplateFile(os.path.join("templates", "conversion.spicy.in"), data,
+    copyTemplateFile("conversion.spicy.in", data,
                      os.path.join(analyzerFolder, spicyConversionFile))
     
     if configuration.conversionFile is not None:
@@ -773,7 +1427,7 @@ def _writeConversionFiles(analyzerFolder, configuration):
             "scope": normalScope,
             "functions": generateBaseConversionFunctions(configuration)
         }
-        copyTemplateFile(os.path.join("templates", "conversion.cc.in"), data,
+        copyTemplateFile("conversion.cc.in", data,
                          os.path.join(analyzerFolder, ccConversionFile))
     return [spicyConversionFile, ccConversionFile]
 
@@ -786,10 +1440,10 @@ def _writeGenerateIDFiles(analyzerFolder):
         "scope": normalScope
     }
 
-    copyTemplateFile(os.path.join("templates", "generateid.spicy.in"), data,
+    copyTemplateFile("generateid.spicy.in", data,
                      os.path.join(analyzerFolder, spicyFile))
 
-    copyTemplateFile(os.path.join("templates", "generateid.cc.in"), data,
+    copyTemplateFile("generateid.cc.in", data,
                      os.path.join(analyzerFolder, ccFile))
 
     return [spicyFile, ccFile]
@@ -818,21 +1472,22 @@ def _writeSpicyScopeFiles(analyzerFolder, configuration, scope, normalScope, add
     if scope == entryPointScope:
         entryPointClass = "public type {0}s = unit {{\n{1} : {0}[];\n}};\n\n".format(entryPointName, utils.SINGLE_TAB)
     
-    objectsString = ""
+    objectsOutput = emitter.Emitter()
     if normalScope in objects:
         for currentObjectName in objects[normalScope]:
             # TODO: Other cases where things need to be public?
             shouldBePublic = currentObjectName == entryPointName
-            objectsString += "{0}\n".format(objects[normalScope][currentObjectName].createSpicyString(configuration.customFieldTypes, bitfields, switches, enums, shouldBePublic))
+            objectsOutput.write(objects[normalScope][currentObjectName].createSpicyString(configuration.customFieldTypes, bitfields, switches, enums, shouldBePublic))
+            objectsOutput.write("\n")
     
     data = {
         "scope": normalScope,
         "additionalScopes": additionalScopeImports,
         "entryPoint": entryPointClass,
-        "objectsString": objectsString
+        "objectsString": objectsOutput.getValue()
     }
     outputFileName = normalScope.lower() + ".spicy"
-    copyTemplateFile(os.path.join("templates", "scope.spicy.in"),
+    copyTemplateFile("scope.spicy.in",
                      data,
                      os.path.join(analyzerFolder, outputFileName))
                      
@@ -840,7 +1495,7 @@ def _writeSpicyScopeFiles(analyzerFolder, configuration, scope, normalScope, add
     
 def _determineProtocolEventsString(normalScope, entryPointScope, entryPointName, transportProtocols, configuration):
     if normalScope == utils.normalizedScope(utils.DEFAULT_SCOPE, ""):
-        return generateProtocolEvents(normalScope, entryPointScope, entryPointName, transportProtocols, utils.USES_LAYER_2)
+        return generateProtocolEvents(normalScope, entryPointScope, entryPointName, transportProtocols, generation_context.current().usesLayer2)
     else:
         return ""
         
@@ -876,12 +1531,12 @@ def _determineExportString(scopedObjects, normalScope):
     return exportString
     
 def _determineObjectEventsString(scopedObjects, normalScope, bitfields):
-    objectEvents = ""
+    objectEvents = emitter.Emitter()
     for object in scopedObjects.values():
         event = object.getEvent(normalScope)
         if event != []:
-            objectEvents += event.generateEvent(bitfields)
-    return objectEvents
+            objectEvents.write(event.generateEvent(bitfields))
+    return objectEvents.getValue()
     
 def _writeSpicyEventFiles(analyzerFolder, configuration, scope, normalScope, entryPointScope, entryPointName, additionalScopeImports, transportProtocols, objects, bitfields):
     protocolEvents = _determineProtocolEventsString(normalScope, entryPointScope, entryPointName, transportProtocols, configuration)
@@ -897,14 +1552,14 @@ def _writeSpicyEventFiles(analyzerFolder, configuration, scope, normalScope, ent
     data = {
         "scope": normalScope,
         "additionalScopes": additionalScopeImports,
-        "protocolName": utils.PROTOCOL_NAME,
+        "protocolName": generation_context.current().protocolName,
         "protocolEvents": protocolEvents,
         "entryPointEvent": entryPointEvent,
         "exportString": exportString,
         "objectEvents": objectEvents
     }
     evtFileName = normalScope.lower() + ".evt"
-    copyTemplateFile(os.path.join("templates", "events.evt.in"), data,
+    copyTemplateFile("events.evt.in", data,
                      os.path.join(analyzerFolder, evtFileName))
     return [evtFileName]
     
@@ -912,20 +1567,39 @@ def _writeSpicyEnumFiles(analyzerFolder, scope, enums):
     enumScope = utils.normalizedScope(scope, "enum")
     if enumScope in enums:
         enumOutputFileName = enumScope.lower() + ".spicy"
-        contentString = ""
+        contents = emitter.Emitter()
         for currentEnumName in enums[enumScope]:
-            contentString += "{0}\n".format(enums[enumScope][currentEnumName].createSpicyEnumString())
+            contents.write(enums[enumScope][currentEnumName].createSpicyEnumString())
+            contents.write("\n")
         data = {
             "scope": enumScope,
-            "contents": contentString
+            "contents": contents.getValue()
         }
-        copyTemplateFile(os.path.join("templates", "enum.spicy.in"), data,
+        copyTemplateFile("enum.spicy.in", data,
                          os.path.join(analyzerFolder, enumOutputFileName))
         return [enumOutputFileName]
     else:
         return []
     
-def writeSpicyFiles(configuration, outRootFolder, crossScopeItems, bitfields, enums, objects, switches, entryPointScope, entryPointName):
+def _writeSpicyFilesForScope(analyzerFolder, configuration, scope, crossScopeItems, transportProtocols, bitfields, enums, objects, switches, entryPointScope, entryPointName):
+    reusedFiles = _reuseScopeFiles("spicy", scope)
+    if reusedFiles is not None:
+        return reusedFiles
+
+    normalScope = utils.normalizedScope(scope, "")
+    additionalScopeImports = _determineScopeImportLines(normalScope, crossScopeItems)
+    
+    # Figure out the scope file
+    sourceFiles = _writeSpicyScopeFiles(analyzerFolder, configuration, scope, normalScope, additionalScopeImports, entryPointScope, entryPointName, objects, bitfields, switches, enums)
+    
+    # Figure out the event file
+    sourceFiles += _writeSpicyEventFiles(analyzerFolder, configuration, scope, normalScope, entryPointScope, entryPointName, additionalScopeImports, transportProtocols, objects, bitfields)
+
+    sourceFiles += _writeSpicyEnumFiles(analyzerFolder, scope, enums)
+    _finishScopeFiles()
+    return sourceFiles
+
+def writeSpicyFiles(configuration, outRootFolder, crossScopeItems, bitfields, enums, objects, switches, entryPointScope, entryPointName, workers=None):
     # Create basic spicy files
     analyzerFolder = os.path.join(outRootFolder, "analyzer")
     os.makedirs(analyzerFolder, exist_ok=True)
@@ -938,18 +1612,10 @@ def writeSpicyFiles(configuration, outRootFolder, crossScopeItems, bitfields, en
             
     transportProtocols = determineTransportProtocols(configuration)
             
-    # Create all the other files
-    for scope in configuration.scopes:
-        normalScope = utils.normalizedScope(scope, "")
-        additionalScopeImports = _determineScopeImportLines(normalScope, crossScopeItems)
-        
-        # Figure out the scope file
-        sourceFiles += _writeSpicyScopeFiles(analyzerFolder, configuration, scope, normalScope, additionalScopeImports, entryPointScope, entryPointName, objects, bitfields, switches, enums)
-        
-        # Figure out the event file
-        sourceFiles += _writeSpicyEventFiles(analyzerFolder, configuration, scope, normalScope, entryPointScope, entryPointName, additionalScopeImports, transportProtocols, objects, bitfields)
-
-        sourceFiles += _writeSpicyEnumFiles(analyzerFolder, scope, enums)
+    # Create all the other files, in parallel but listed in the configured order
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        for scopeFiles in executor.map(generation_context.bind(lambda scope: _writeSpicyFilesForScope(analyzerFolder, configuration, scope, crossScopeItems, transportProtocols, bitfields, enums, objects, switches, entryPointScope, entryPointName)), configuration.scopes):
+            sourceFiles += scopeFiles
                 
     return (analyzerFolder, sourceFiles)
         
@@ -957,27 +1623,39 @@ def writeLastCMakeFile(analyzerFolder, scriptFiles, sourceFiles):
     # Create CMakeLists.txt file with all the sources and scripts
     
     data = {
-        "protocolName": utils.PROTOCOL_NAME,
+        "protocolName": generation_context.current().protocolName,
         "sources": " ".join(sourceFiles),
         "scripts": " ".join(scriptFiles)
     }
     
-    copyTemplateFile(os.path.join("templates", "analyzer_CMakeLists.txt.in"),
+    copyTemplateFile("analyzer_CMakeLists.txt.in",
                      data,
                      os.path.join(analyzerFolder, "CMakeLists.txt"))
     
-def writeParserFiles(configuration, outRootFolder, zeekTypes, zeekMainFileObject, crossScopeItems, bitfields, enums, objects, switches, entryPointScope, entryPointName):
+def writeParserFiles(configuration, outRootFolder, zeekTypes, zeekMainFileObject, crossScopeItems, bitfields, enums, objects, switches, entryPointScope, entryPointName, writeWorkers=None):
     # Create base folder
     os.makedirs(outRootFolder, exist_ok=True)
-    # Basic files such as .gitignore and README
-    writeBasicFiles(configuration, outRootFolder)
-    # Fill in the rest of the structure
-    writeCMakeFiles(outRootFolder)
-    writePackagingFiles(configuration, outRootFolder)
-    writeTestFiles(outRootFolder)
-    # Must be called in this order...there are side effects of calling this one
-    # that are required for the other one to work correctly
-    folder, sourceFiles = writeSpicyFiles(configuration, outRootFolder, crossScopeItems, bitfields, enums, objects, switches, entryPointScope, entryPointName)
-    # TODO: Figure out what is creating the side effects in the previous call
-    scriptFiles = writeZeekFiles(configuration, outRootFolder, zeekTypes, zeekMainFileObject, bitfields, enums, objects, switches)
-    writeLastCMakeFile(folder, scriptFiles, sourceFiles)
+    outputWriter = output_files.OutputWriter(outRootFolder)
+    # The files of a scope whose inputs did not change are kept as they are
+    scopeHashes = calculateScopeInputHashes(configuration, crossScopeItems, zeekTypes, objects, switches, bitfields, enums, entryPointScope, entryPointName)
+    groupInputs = {}
+    for scope, scopeHash in scopeHashes.items():
+        groupInputs["spicy:" + scope] = scopeHash
+        groupInputs["zeek:" + scope] = scopeHash
+    outputWriter.setGroupInputs(groupInputs)
+    token = _currentOutputWriter.set(outputWriter)
+    try:
+        # Basic files such as .gitignore and README
+        writeBasicFiles(configuration, outRootFolder)
+        # Fill in the rest of the structure
+        writeCMakeFiles(outRootFolder)
+        writePackagingFiles(configuration, outRootFolder)
+        writeTestFiles(outRootFolder)
+        # Neither changes any structure, so they do not depend on each other
+        folder, sourceFiles = writeSpicyFiles(configuration, outRootFolder, crossScopeItems, bitfields, enums, objects, switches, entryPointScope, entryPointName, writeWorkers)
+        scriptFiles = writeZeekFiles(configuration, outRootFolder, zeekTypes, zeekMainFileObject, bitfields, enums, objects, switches, writeWorkers)
+        writeLastCMakeFile(folder, scriptFiles, sourceFiles)
+    finally:
+        _currentOutputWriter.reset(token)
+    outputWriter.finish()
+    outputWriter.printSummary()
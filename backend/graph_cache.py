@@ -0,0 +1,129 @@
+# Copyright 2024, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
+
+# This file contains functions for caching the graph analysis results on disk
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import threading
+
+import utils
+import generation_context
+
+# Bump whenever the contents of the cached graph information change
+CACHE_VERSION = 4
+
+# Number of cache entries kept for every base key, newest first
+CACHE_ENTRIES_PER_BASE_KEY = 4
+
+# Guards the list of recent entries of a base key within this process
+_recentEntriesLock = threading.Lock()
+
+def _serializeStructure(item):
+    if isinstance(item, set):
+        return sorted(item)
+    if hasattr(item, "__slots__"):
+        return {name: getattr(item, name) for name in item.__slots__ if hasattr(item, name)}
+    return vars(item)
+
+def hashContents(contents):
+    serializedContents = json.dumps(contents, sort_keys=True, default=_serializeStructure)
+    return hashlib.sha256(serializedContents.encode()).hexdigest()
+
+def calculateBaseKey(configuration, entryPointScope, entryPointKey, analysisOptions):
+    # Identifies everything besides the scope contents that the graph analysis
+    # depends on
+    return hashContents([
+        CACHE_VERSION,
+        generation_context.current().protocolName,
+        entryPointScope,
+        entryPointKey,
+        analysisOptions,
+        configuration.customFieldTypes
+    ])
+
+def calculateScopeHashes(scopes, objects, switches, bitfields, enums):
+    # This has to happen before the analysis results are written back into
+    # the objects
+    scopeHashes = {}
+    for scope in scopes:
+        scopeHashes[scope] = hashContents([
+            objects.get(utils.normalizedScope(scope, "object")),
+            switches.get(utils.normalizedScope(scope, "switch")),
+            bitfields.get(utils.normalizedScope(scope, "bitfield")),
+            enums.get(utils.normalizedScope(scope, "enum"))
+        ])
+    return scopeHashes
+
+def calculateCacheKey(baseKey, scopeHashes):
+    return hashContents([baseKey, list(scopeHashes.items())])
+
+def determineChangedScopes(previousScopeHashes, scopeHashes):
+    # Scopes can only be patched individually if the list of scopes is the same
+    if list(previousScopeHashes) != list(scopeHashes):
+        return None
+    return [scope for scope in scopeHashes if previousScopeHashes[scope] != scopeHashes[scope]]
+
+def _cacheFilePath(cacheFolder, cacheKey):
+    return os.path.join(cacheFolder, "graph_{}.pickle".format(cacheKey))
+
+def _latestFilePath(cacheFolder, baseKey):
+    return os.path.join(cacheFolder, "latest_{}.txt".format(baseKey))
+
+def _writeAtomically(filePath, mode, writer):
+    # Write to a uniquely named temporary file first so an interrupted run
+    # never leaves a partial cache entry behind and concurrent writers of the
+    # same entry do not write into the same file
+    fileDescriptor, temporaryFilePath = tempfile.mkstemp(prefix=os.path.basename(filePath) + ".", suffix=".tmp", dir=os.path.dirname(filePath))
+    try:
+        with os.fdopen(fileDescriptor, mode) as file:
+            writer(file)
+        os.replace(temporaryFilePath, filePath)
+    except BaseException:
+        os.remove(temporaryFilePath)
+        raise
+
+def loadGraphInformation(cacheFolder, cacheKey):
+    cacheFilePath = _cacheFilePath(cacheFolder, cacheKey)
+    if not os.path.isfile(cacheFilePath):
+        return None
+    try:
+        with open(cacheFilePath, "rb") as file:
+            graphInformation = pickle.load(file)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError, TypeError, ValueError):
+        # Also covers entries pickled by an older version of the backend
+        print("Ignoring unreadable graph cache {0}".format(cacheFilePath))
+        return None
+    print("Using cached graph information {0}".format(cacheFilePath))
+    return graphInformation
+
+def _loadRecentCacheKeys(cacheFolder, baseKey):
+    # The latest file lists the cache keys of the base key, newest first
+    latestFilePath = _latestFilePath(cacheFolder, baseKey)
+    if not os.path.isfile(latestFilePath):
+        return []
+    with open(latestFilePath, "r") as file:
+        return [line.strip() for line in file if line.strip() != ""]
+
+def loadLatestGraphInformation(cacheFolder, baseKey):
+    # Returns the results of the last run with the same base key, which are
+    # used as the starting point when only some scopes changed
+    recentCacheKeys = _loadRecentCacheKeys(cacheFolder, baseKey)
+    if len(recentCacheKeys) == 0:
+        return None
+    return loadGraphInformation(cacheFolder, recentCacheKeys[0])
+
+def storeGraphInformation(cacheFolder, baseKey, cacheKey, graphInformation, maximumEntries=CACHE_ENTRIES_PER_BASE_KEY):
+    os.makedirs(cacheFolder, exist_ok=True)
+    _writeAtomically(_cacheFilePath(cacheFolder, cacheKey), "wb", lambda file: pickle.dump(graphInformation, file, protocol=pickle.HIGHEST_PROTOCOL))
+    # Only the newest entries of the base key are kept. Another process
+    # storing at the same time can at worst leave an entry that is no longer
+    # listed behind.
+    with _recentEntriesLock:
+        recentCacheKeys = [cacheKey] + [key for key in _loadRecentCacheKeys(cacheFolder, baseKey) if key != cacheKey]
+        _writeAtomically(_latestFilePath(cacheFolder, baseKey), "w", lambda file: file.write("\n".join(recentCacheKeys[:maximumEntries]) + "\n"))
+        for evictedCacheKey in recentCacheKeys[maximumEntries:]:
+            evictedFilePath = _cacheFilePath(cacheFolder, evictedCacheKey)
+            if os.path.isfile(evictedFilePath):
+                os.remove(evictedFilePath)
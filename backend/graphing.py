@@ -4,9 +4,10 @@
 
 # Local Imports
 import utils
+import json_backend
 
 # Standard Library Imports
-import json
+from collections import namedtuple
 
 ################################################################################
 # Type Declarations
@@ -25,6 +26,12 @@ languageTypes = [
 
 bitfieldSpecificTypes = ["bool", "uint", "enum"]
 
+# Key of the node table, which the graph also stores as node payloads. The
+# parts are kept separate so names containing dots can not collide, e.g. an
+# object named "A.b" and the field b of object A.
+# field is None for structure nodes, scope is None for user type nodes.
+NodeIdentity = namedtuple("NodeIdentity", ["scope", "type", "name", "field"])
+
 structureTypes = {
     "bits": "Bitfields", # Maps to bitfield structures
     "enum": "Enums", # Maps to enum structures
@@ -41,12 +48,24 @@ otherReferenceTypes = {
 ################################################################################
 
 def loadFile(filePath):
-    with open(filePath, "r") as file:
-        contents = json.load(file)
-    return contents
+    return json_backend.loadFile(filePath)
     
 def normalizedKey3(value1, value2, value3):
     return "{}.{}.{}".format(value1, value2, value3)
+
+def structureNode(scope, itemType, name):
+    return NodeIdentity(scope, itemType, name, None)
+
+def userTypeNode(userType):
+    return NodeIdentity(None, "user", userType, None)
+
+def reportKey(identity):
+    # Dotted form of a node, only used for reports and debugging output
+    if identity.scope is None:
+        return identity.name
+    if identity.field is None:
+        return normalizedKey3(identity.scope, identity.type, identity.name)
+    return normalizedKey4(identity.scope, identity.type, identity.name, identity.field)
     
 def normalizedType(itemType, referenceScope, referenceType, elementType,
                    itemSize, isReference, userDefinedTypes):
@@ -61,24 +80,24 @@ def normalizedType(itemType, referenceScope, referenceType, elementType,
         denoteReference = isReference
         if isReference:
             #returnReference = normalizedKey3(utils.normalizedScope(referenceScope, itemType), itemType, referenceType)
-            returnReference = normalizedKey3(referenceScope, itemType, referenceType)
+            returnReference = structureNode(referenceScope, itemType, referenceType)
     elif "bits" == itemType:
         returnValue = "Bitfield"
         denoteReference = isReference
         if isReference:
             #returnReference = normalizedKey3(utils.normalizedScope(referenceScope, itemType), itemType, referenceType)
-            returnReference = normalizedKey3(referenceScope, itemType, referenceType)
+            returnReference = structureNode(referenceScope, itemType, referenceType)
     elif "enum" == itemType:
         returnValue = "Enum"
         denoteReference = isReference
         if isReference:
-            returnReference = normalizedKey3(referenceScope, itemType, referenceType)
+            returnReference = structureNode(referenceScope, itemType, referenceType)
     elif "switch" == itemType:
         returnValue = "Switch"
         denoteReference = isReference
         if isReference:
             #returnReference = normalizedKey3(utils.normalizedScope(referenceScope, itemType), itemType, referenceType)
-            returnReference = normalizedKey3(referenceScope, itemType, referenceType)
+            returnReference = structureNode(referenceScope, itemType, referenceType)
     elif "user" == itemType:
         returnValue = "UserType"
         denoteReference = isReference
@@ -90,7 +109,7 @@ def normalizedType(itemType, referenceScope, referenceType, elementType,
         isList = True
     elif itemType in userDefinedTypes:
         returnValue = itemType + "(" + str(itemSize) + ")"
-        returnReference = itemType
+        returnReference = userTypeNode(itemType)
     elif itemType in bitfieldSpecificTypes:
         returnValue = itemType
     else:
@@ -121,7 +140,7 @@ def normalizedLabel(itemType, referenceScope, referenceType, elementType,
 def addUserTypeNode(userType, nodeInformation, metaData, userDefinedTypes):
     label, _, _ = normalizedLabel("user", None, None, None, None, userType, False,
                                   userDefinedTypes)
-    nodeInformation[userType] = (label, metaData)
+    nodeInformation[userTypeNode(userType)] = (label, metaData)
     
 def _valueOrDefault(item, key, default):
     if hasattr(item, key):
@@ -141,8 +160,7 @@ def addItemNode(itemScope, item, itemType, nodeInformation, metaData, userDefine
     metaData["logWithParent"] = _valueOrDefault(item, "logWithParent", False)
     label, _, _ = normalizedLabel(itemType, None, None, None, None, name, False,
                                   userDefinedTypes)
-    nodeReference = normalizedKey3(itemScope, itemType, name)
-    nodeInformation[nodeReference] = (label, metaData)
+    nodeInformation[structureNode(itemScope, itemType, name)] = (label, metaData)
     return name
     
 def normalizedKey2(value1, value2):
@@ -154,9 +172,8 @@ def normalizedKey4(value1, value2, value3, value4):
 def _addNodeItem(parentScope, parentType, parentName, item, storage,
                  userDefinedTypes):
     labelName = normalizedKey2(parentName, item.name)
-    parentKeyName = normalizedKey3(parentScope, parentType, parentName)
-    keyName = normalizedKey4(parentScope, parentType, parentName,
-                             item.name)
+    parentKeyName = structureNode(parentScope, parentType, parentName)
+    keyName = NodeIdentity(parentScope, parentType, parentName, item.name)
     label, referenceType, isList = \
         normalizedLabel(_valueOrDefault(item, "type", None),
                         _valueOrDefault(item, "scope", None),
@@ -0,0 +1,144 @@
+# Copyright 2024, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
+
+# This file contains the single file form of the intermediate language. A bundle
+# holds the config and every scope's files as JSON lines, followed by an index
+# of where each file starts so a scope can be decoded without the others.
+# Scopes are the smallest unit that is decoded, since every structure of a
+# loaded scope is needed to find what is reachable from the EntryPoint.
+#
+#   line 1:      {"parsnipBundle": <version>}
+#   lines 2..n:  the config, then one list of structures per scope file
+#   last line:   {"config": [offset, length],
+#                 "scopes": {scope: {fileType: [offset, length]}}}
+#
+# Usage: python3 il_bundle.py pack <inputRootDirectory> <bundleFile>
+#        python3 il_bundle.py unpack <bundleFile> <outputRootDirectory>
+import argparse
+import json
+import mmap
+import os
+
+import json_backend
+import utils
+
+BUNDLE_VERSION = 2
+
+# Every bundle starts with this, whatever its version
+BUNDLE_HEADER = b'{"parsnipBundle":'
+
+# In the order the files are read from a scope folder
+FILE_TYPES = ["objects", "switches", "bitfields", "enums"]
+
+def isBundle(path):
+    # Only the start of the header is read, so other files are not mistaken
+    # for a bundle
+    if not os.path.isfile(path):
+        return False
+    with open(path, "rb") as file:
+        return BUNDLE_HEADER == file.read(len(BUNDLE_HEADER))
+
+class Bundle:
+    def __init__(self, bundlePath):
+        self.path = bundlePath
+        self.file = open(bundlePath, "rb")
+        try:
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files can not be mapped
+            self.file.close()
+            raise ValueError("{0} is not a parsnip bundle".format(bundlePath))
+
+        try:
+            header = json_backend.loads(self.data[:self.data.find(b"\n")])
+            indexStart = self.data.rfind(b"\n", 0, len(self.data) - 1) + 1
+            self.index = json_backend.loads(self.data[indexStart:])
+        except ValueError:
+            self.close()
+            raise ValueError("{0} is not a parsnip bundle or is incomplete".format(bundlePath))
+        if not isinstance(header, dict) or BUNDLE_VERSION != header.get("parsnipBundle"):
+            self.close()
+            raise ValueError("{0} is not a version {1} parsnip bundle".format(bundlePath, BUNDLE_VERSION))
+
+    def _decode(self, location):
+        offset, length = location
+        return json_backend.loads(self.data[offset:offset + length])
+
+    def loadConfig(self):
+        return self._decode(self.index["config"])
+
+    def hasFile(self, scope, fileType):
+        return fileType in self.index["scopes"].get(scope, {})
+
+    def filePath(self, scope, fileType):
+        # Only used to report what is being processed
+        return "{0}:{1}/{2}.json".format(self.path, scope, fileType)
+
+    def loadStructures(self, scope, fileType):
+        # Decodes the structures of one of the scope's files
+        return self._decode(self.index["scopes"][scope][fileType])
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exceptionInformation):
+        self.close()
+
+def _writeLine(file, contents):
+    offset = file.tell()
+    line = json.dumps(contents, separators=(",", ":")).encode()
+    file.write(line + b"\n")
+    return [offset, len(line)]
+
+def packBundle(inputRootDirectory, bundlePath):
+    # Converts the folder form of the intermediate language into a bundle
+    configPath = os.path.join(inputRootDirectory, utils.DEFAULT_SCOPE, "config.json")
+    configObject = json_backend.loadFile(configPath)
+
+    index = {"scopes": {}}
+    with open(bundlePath, "wb") as file:
+        _writeLine(file, {"parsnipBundle": BUNDLE_VERSION})
+        index["config"] = _writeLine(file, configObject)
+        for scope in configObject["Scopes"]:
+            scopeIndex = {}
+            for fileType in FILE_TYPES:
+                filePath = os.path.join(inputRootDirectory, scope, fileType + ".json")
+                if not os.path.isfile(filePath):
+                    continue
+                scopeIndex[fileType] = _writeLine(file, json_backend.loadFile(filePath))
+            index["scopes"][scope] = scopeIndex
+        file.write(json.dumps(index, separators=(",", ":")).encode() + b"\n")
+
+def unpackBundle(bundlePath, outputRootDirectory):
+    # Converts a bundle back into the folder form of the intermediate language
+    with Bundle(bundlePath) as bundle:
+        configObject = bundle.loadConfig()
+        os.makedirs(os.path.join(outputRootDirectory, utils.DEFAULT_SCOPE), exist_ok=True)
+        with open(os.path.join(outputRootDirectory, utils.DEFAULT_SCOPE, "config.json"), "w") as file:
+            json.dump(configObject, file, indent=4)
+
+        for scope in bundle.index["scopes"]:
+            os.makedirs(os.path.join(outputRootDirectory, scope), exist_ok=True)
+            for fileType in FILE_TYPES:
+                if bundle.hasFile(scope, fileType):
+                    with open(os.path.join(outputRootDirectory, scope, fileType + ".json"), "w") as file:
+                        json.dump(bundle.loadStructures(scope, fileType), file, indent=4)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    packParser = subparsers.add_parser("pack", help="Convert an intermediate language folder into a bundle")
+    packParser.add_argument("inputRootDirectory", type=str, help="Path to folder with '{0}' folder".format(utils.DEFAULT_SCOPE))
+    packParser.add_argument("bundleFile", type=str, help="Bundle to create")
+    unpackParser = subparsers.add_parser("unpack", help="Convert a bundle into an intermediate language folder")
+    unpackParser.add_argument("bundleFile", type=str, help="Bundle to read")
+    unpackParser.add_argument("outputRootDirectory", type=str, help="Folder to write the intermediate language to")
+    args = parser.parse_args()
+
+    if "pack" == args.command:
+        packBundle(args.inputRootDirectory, args.bundleFile)
+    else:
+        unpackBundle(args.bundleFile, args.outputRootDirectory)
@@ -3,6 +3,8 @@
 import utils
 
 class Input:
+    __slots__ = ("source", "minus", "minusInUse")
+
     def __init__(self, source, minus=""):
         self.source = source
         self.minus = minus
@@ -19,6 +21,8 @@ class Input:
         return outputString
 
 class Dependency:
+    __slots__ = ("name", "type", "size", "referenceType", "scope")
+
     def __init__(self, name, type, size="", referenceType = "", scope = ""):
         self.name = name
         self.type = type
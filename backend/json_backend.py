@@ -0,0 +1,34 @@
+# Copyright 2024, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
+
+# This file contains the JSON parser used to read the intermediate language.
+# A faster parser is used when one is installed, otherwise the standard
+# library parser is used.
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+if orjson is not None:
+    BACKEND_NAME = "orjson"
+    _loads = orjson.loads
+elif msgspec is not None:
+    BACKEND_NAME = "msgspec"
+    _loads = msgspec.json.decode
+else:
+    BACKEND_NAME = "json"
+    _loads = json.loads
+
+def loads(data):
+    return _loads(data)
+
+def loadFile(filePath):
+    # Read the raw bytes so every backend can decode the file itself
+    with open(filePath, "rb") as file:
+        return _loads(file.read())
@@ -1,7 +1,10 @@
 # Copyright 2024, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
 
 # This file contains functions for reading each json file type
-import json
+import concurrent.futures
+import json_backend
+import il_bundle
+import conditionals
 import enums
 import objects
 import inputs
@@ -9,58 +12,177 @@ import switches
 import bitfields
 import zeektypes
 import utils
+import generation_context
 import os
+import sys
 
-def loadFiles(rootFilePath, scopes):
+def _loadBundledScopeFiles(bundle, scope):
+    scopeFiles = {}
+    if bundle.hasFile(scope, "objects"):
+        scopeFiles["objects"] = (bundle.filePath(scope, "objects"), processObjectsList(bundle.loadStructures(scope, "objects"), scope))
+    if bundle.hasFile(scope, "switches"):
+        scopeFiles["switches"] = (bundle.filePath(scope, "switches"), processSwitchList(bundle.loadStructures(scope, "switches")))
+    if bundle.hasFile(scope, "bitfields"):
+        scopeFiles["bitfields"] = (bundle.filePath(scope, "bitfields"), processBitfieldList(bundle.loadStructures(scope, "bitfields")))
+    if bundle.hasFile(scope, "enums"):
+        scopeFiles["enums"] = (bundle.filePath(scope, "enums"), processEnumList(bundle.loadStructures(scope, "enums")))
+    return scopeFiles
+
+def _loadScopeFiles(rootFilePath, scope):
+    # Reads and parses the files of a single scope, keeping track of which
+    # files were found so they can be reported in scope order afterwards.
+    # rootFilePath is either the input folder or an opened il_bundle.Bundle
+    if isinstance(rootFilePath, il_bundle.Bundle):
+        return _loadBundledScopeFiles(rootFilePath, scope)
+
+    scopeFiles = {}
+    objectFilePath = os.path.join(rootFilePath, scope, "objects.json")
+    switchesFilePath = os.path.join(rootFilePath, scope, "switches.json")
+    bitfieldsFilePath = os.path.join(rootFilePath, scope, "bitfields.json")
+    enumsFilePath = os.path.join(rootFilePath, scope, "enums.json")
+    
+    if os.path.isfile(objectFilePath):
+        scopeFiles["objects"] = (objectFilePath, processObjectsFile(objectFilePath, scope))
+    if os.path.isfile(switchesFilePath):
+        scopeFiles["switches"] = (switchesFilePath, processSwitchFile(switchesFilePath))
+    if os.path.isfile(bitfieldsFilePath):
+        scopeFiles["bitfields"] = (bitfieldsFilePath, processBitfieldFile(bitfieldsFilePath))
+    if os.path.isfile(enumsFilePath):
+        scopeFiles["enums"] = (enumsFilePath, processEnumFile(enumsFilePath))
+    return scopeFiles
+
+def _mergeScopeFile(scopeFiles, fileType, structures, normalizedScope):
+    if fileType in scopeFiles:
+        filePath, contents = scopeFiles[fileType]
+        print("Processing {0}".format(filePath))
+        structures[normalizedScope] = contents
+
+def loadFiles(rootFilePath, scopes, workers=None):
     objects = {}
     switches = {}
     bitfields = {}
     enums = {}
 
-    for scope in scopes:
-        objectFilePath = os.path.join(rootFilePath, scope, "objects.json")
-        switchesFilePath = os.path.join(rootFilePath, scope, "switches.json")
-        bitfieldsFilePath = os.path.join(rootFilePath, scope, "bitfields.json")
-        enumsFilePath = os.path.join(rootFilePath, scope, "enums.json")
-        
-        if os.path.isfile(objectFilePath):
-            print("Processing {0}".format(objectFilePath))
-            objects[utils.normalizedScope(scope, "object")] = processObjectsFile(objectFilePath, scope)
-        if os.path.isfile(switchesFilePath):
-            print("Processing {0}".format(switchesFilePath))
-            switches[utils.normalizedScope(scope, "switch")] = processSwitchFile(switchesFilePath)
-        if os.path.isfile(bitfieldsFilePath):
-            print("Processing {0}".format(bitfieldsFilePath))
-            bitfields[utils.normalizedScope(scope, "bitfield")] = processBitfieldFile(bitfieldsFilePath)
-        if os.path.isfile(enumsFilePath):
-            print("Processing {0}".format(enumsFilePath))
-            enums[utils.normalizedScope(scope, "enum")] = processEnumFile(enumsFilePath)
+    # The scopes are read in parallel, but merged in the configured order so
+    # everything downstream sees the same dictionaries as a serial load
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        loadedScopes = list(executor.map(generation_context.bind(lambda scope: _loadScopeFiles(rootFilePath, scope)), scopes))
+    
+    for scope, scopeFiles in zip(scopes, loadedScopes):
+        _mergeScopeFile(scopeFiles, "objects", objects, utils.normalizedScope(scope, "object"))
+        _mergeScopeFile(scopeFiles, "switches", switches, utils.normalizedScope(scope, "switch"))
+        _mergeScopeFile(scopeFiles, "bitfields", bitfields, utils.normalizedScope(scope, "bitfield"))
+        _mergeScopeFile(scopeFiles, "enums", enums, utils.normalizedScope(scope, "enum"))
             
     return (objects, switches, bitfields, enums)
 
+# Field types that refer to another structure -> the kind of that structure
+_REFERENCE_KINDS = {"object": "object", "switch": "switch", "bits": "bitfield", "enum": "enum"}
+
+def _structureReferences(kind, structure):
+    # Returns the (kind, normalized scope, name) of every structure the given
+    # structure refers to
+    items = []
+    if "object" == kind:
+        items = structure.fields + structure.dependsOn
+    elif "switch" == kind:
+        items = [structure.dependsOn] + structure.additionalDependsOn + [option.action for option in structure.options] + [structure.default]
+    elif "bitfield" == kind:
+        items = structure.fields
+
+    references = []
+    for item in items:
+        if item is None:
+            continue
+        itemType = item.type
+        if "list" == itemType:
+            itemType = getattr(item, "elementType", "")
+        if itemType in _REFERENCE_KINDS:
+            references.append((_REFERENCE_KINDS[itemType], item.scope, item.referenceType))
+    return references
+
+def loadReachableScopeFiles(rootFilePath, scopes, entryPointScope, entryPointName):
+    # Loads the EntryPoint's scope and then only the scopes that the structures
+    # reachable from the EntryPoint refer to. The default scope is always loaded
+    # since bitfields and the main file fall back to it.
+    # Returns the loaded scopes in the configured order along with the files
+    objects = {}
+    switches = {}
+    bitfields = {}
+    enums = {}
+    structures = {"object": objects, "switch": switches, "bitfield": bitfields, "enum": enums}
+
+    # normalized scope -> scope, for every kind of structure
+    scopeNames = {}
+    for scope in scopes:
+        for kind in structures:
+            scopeNames[utils.normalizedScope(scope, kind)] = scope
+
+    loadedScopes = set()
+    def loadScope(scope):
+        if scope in loadedScopes:
+            return
+        loadedScopes.add(scope)
+        scopeFiles = _loadScopeFiles(rootFilePath, scope)
+        _mergeScopeFile(scopeFiles, "objects", objects, utils.normalizedScope(scope, "object"))
+        _mergeScopeFile(scopeFiles, "switches", switches, utils.normalizedScope(scope, "switch"))
+        _mergeScopeFile(scopeFiles, "bitfields", bitfields, utils.normalizedScope(scope, "bitfield"))
+        _mergeScopeFile(scopeFiles, "enums", enums, utils.normalizedScope(scope, "enum"))
+
+    if utils.DEFAULT_SCOPE in scopes:
+        loadScope(utils.DEFAULT_SCOPE)
+
+    visited = set()
+    pending = [("object", entryPointScope, entryPointName)]
+    while len(pending) > 0:
+        kind, scope, name = pending.pop()
+        if (kind, scope, name) in visited:
+            continue
+        visited.add((kind, scope, name))
+
+        # Structures that are not part of a configured scope (custom types,
+        # misspelled scopes, ...) are left for the later stages to report
+        if scope not in scopes:
+            continue
+        loadScope(scope)
+
+        structure = structures[kind].get(utils.normalizedScope(scope, kind), {}).get(name)
+        if structure is None:
+            continue
+        for referenceKind, referenceScope, referenceName in _structureReferences(kind, structure):
+            # References without a scope are looked up in the current scope
+            referenceScope = scopeNames.get(referenceScope, scope if "" == referenceScope else None)
+            if referenceScope is not None:
+                pending.append((referenceKind, referenceScope, referenceName))
+
+    # Keep the configured order so the output does not depend on the order
+    # the references were found in
+    loadedScopeList = [scope for scope in scopes if scope in loadedScopes]
+    for fileStructures in [objects, switches, bitfields, enums]:
+        orderedStructures = sorted(fileStructures.items(), key=lambda item: loadedScopeList.index(scopeNames[item[0]]))
+        fileStructures.clear()
+        fileStructures.update(orderedStructures)
+
+    return (loadedScopeList, (objects, switches, bitfields, enums))
+
 def passThroughLink(switchName, objectField, scopes, allObjects, allSwitches, linkObjectField):
-    for scope in scopes: 
-        if switchName in allSwitches[utils.normalizedScope(scope, "")]:
-            switch = allSwitches[utils.normalizedScope(scope, "")][switchName]
-            break
+    _, _, switch = utils.findSymbol("switch", switchName)
     if switch != None:
         for item in switch.options:
             objectName = item.action.referenceType
-            for scope in scopes: 
-                if objectName in allObjects[utils.normalizedScope(scope, "")]:
-                    object = allObjects[utils.normalizedScope(scope, "")][objectName]
-                    object.addLinkField(linkObjectField)
-                    dependencyJson =  {
-                            "name": "parentLinkId",
-                            "type": "string",
-                            "size": 8
-                        }
-                    newInput = inputs.Input("parentLinkId")
-                    objectField.addInput(newInput)
-                    newAdditionalDependency = createDependencyFromJSON(dependencyJson)
-                    switch.addAdditionalDependsOn(newAdditionalDependency)
-                    object.addDependency(newAdditionalDependency)
-                    item.action.addInput(newInput)
+            for _, _, object in utils.findSymbols("object", objectName):
+                object.addLinkField(linkObjectField)
+                dependencyJson =  {
+                        "name": "parentLinkId",
+                        "type": "string",
+                        "size": 8
+                    }
+                newInput = inputs.Input("parentLinkId")
+                objectField.addInput(newInput)
+                newAdditionalDependency = createDependencyFromJSON(dependencyJson)
+                switch.addAdditionalDependsOn(newAdditionalDependency)
+                object.addDependency(newAdditionalDependency)
+                item.action.addInput(newInput)
                     
 def _getSwitchJson(spicyFieldName):
     objectDependencyJson =  {
@@ -88,18 +210,37 @@ def _processNonUsageScope(switch, object, item, scope, objectField):
     switch.addAdditionalDependsOn(newAdditionalSwitchDependency)
     newInput = inputs.Input(spicyFieldName)
     item.action.addInput(newInput)
-    if scope not in utils.scopesHaveCrossScopeLinks:
-        utils.scopesHaveCrossScopeLinks[scope] = []
-    if spicyFieldName not in utils.scopesHaveCrossScopeLinks:
-        utils.scopesHaveCrossScopeLinks[scope].append(spicyFieldName)
+    scopesHaveCrossScopeLinks = generation_context.current().scopesHaveCrossScopeLinks
+    if scope not in scopesHaveCrossScopeLinks:
+        scopesHaveCrossScopeLinks[scope] = []
+    if spicyFieldName not in scopesHaveCrossScopeLinks:
+        scopesHaveCrossScopeLinks[scope].append(spicyFieldName)
         
     return linkObjectField
 
 def getSwitchType(switchName, objectField, switchUsageScope, scopes, allObjects, allSwitches):
-    for scope in scopes: 
-        if switchName in allSwitches[utils.normalizedScope(scope, "")]:
-            switch = allSwitches[utils.normalizedScope(scope, "")][switchName]
-            break
+    # Adds the link fields needed by options from other scopes, so this has to
+    # be called before any output is generated
+    _, _, switch = utils.findSymbol("switch", switchName)
+    if switch != None:
+        for item in switch.options:
+            if item.action.type in utils.spicyToZeek:
+                continue
+            scope, _, object = utils.findSymbol("object", item.action.referenceType)
+            if object != None and scope != switchUsageScope:
+                linkObjectField = _processNonUsageScope(switch, object, item, scope, objectField)
+                if linkObjectField == None:
+                    continue
+                if len(object.fields) == 1 and object.fields[0].type == "switch":
+                    passThroughLink(object.fields[0].referenceType, object.fields[0], scopes, allObjects, allSwitches, linkObjectField)
+                else:
+                    object.addLinkField(linkObjectField)
+    return determineSwitchType(switchName, switchUsageScope)
+
+def determineSwitchType(switchName, switchUsageScope):
+    # Same as getSwitchType without changing any structure, for use while
+    # generating output
+    _, _, switch = utils.findSymbol("switch", switchName)
     isSkippedClass = True
     isSelfContained = True
     linkRequired = False
@@ -109,24 +250,15 @@ def getSwitchType(switchName, objectField, switchUsageScope, scopes, allObjects,
                 isSkippedClass = False
                 continue
             objectName = item.action.referenceType
-            for scope in scopes: 
-                if objectName in allObjects[utils.normalizedScope(scope, "")]:
-                    object = allObjects[utils.normalizedScope(scope, "")][objectName]
-                    linkObjectField = None
-                    if scope != switchUsageScope:
-                        linkRequired = True
-                        isSkippedClass = False
-                        linkObjectField = _processNonUsageScope(switch, object, item, scope, objectField)
-                    if not object.logWithParent:
-                        isSelfContained = False
-                    else:
-                        isSkippedClass = False
-                    if not isSkippedClass and linkObjectField != None:
-                        if len(object.fields) == 1 and object.fields[0].type == "switch":
-                            passThroughLink(object.fields[0].referenceType, object.fields[0], scopes, allObjects, allSwitches, linkObjectField)
-                        else:
-                            object.addLinkField(linkObjectField)
-                    break
+            scope, _, object = utils.findSymbol("object", objectName)
+            if object != None:
+                if scope != switchUsageScope:
+                    linkRequired = True
+                    isSkippedClass = False
+                if not object.logWithParent:
+                    isSelfContained = False
+                else:
+                    isSkippedClass = False
         if isSkippedClass:
             return "trivial" 
         elif linkRequired:
@@ -136,21 +268,29 @@ def getSwitchType(switchName, objectField, switchUsageScope, scopes, allObjects,
         else:
             return "invalid"
             
+def _interned(value):
+    # Type names, reference types and endianness repeat across thousands of
+    # fields, so every field shares a single copy of each
+    if isinstance(value, str):
+        return sys.intern(value)
+    return value
+
 def createDependencyFromJSON(dependency):
     if "referenceType" in dependency:
-        newDependency = inputs.Dependency(dependency["name"], dependency["type"], 0, dependency["referenceType"], dependency["scope"])
+        newDependency = inputs.Dependency(dependency["name"], _interned(dependency["type"]), 0, _interned(dependency["referenceType"]), dependency["scope"])
     else: 
-        newDependency = inputs.Dependency(dependency["name"], dependency["type"], dependency["size"])
+        newDependency = inputs.Dependency(dependency["name"], _interned(dependency["type"]), dependency["size"])
     return newDependency
 
 def processEnumFile(file):
+    return processEnumList(json_backend.loadFile(file))
+
+def processEnumList(enumList):
     enumObject = {}
-    with open(file, "r+") as file:
-        enumList = json.load(file)
     for enum in enumList:
         newEnum = enums.Enums(enum["name"], enum["reference"], enum["size"])
         if "endianness" in enum:
-            newEnum.endianness = enum["endianness"]
+            newEnum.endianness = _interned(enum["endianness"])
         if "notes" in enum:
             newEnum.notes = enum["notes"]
         for field in enum["fields"]:
@@ -200,10 +340,29 @@ def _processJoiningConditional(conditional, key, joiner, startingIndex):
 def processConditional(conditional):
     return _processConditional(conditional, 0)
 
+def _freezeConditional(conditional):
+    if isinstance(conditional, dict):
+        return tuple(sorted((key, _freezeConditional(value)) for key, value in conditional.items()))
+    if isinstance(conditional, list):
+        return tuple(_freezeConditional(value) for value in conditional)
+    # Keep 1, 1.0 and True apart since they are rendered differently
+    return (type(conditional).__name__, conditional)
+
+def internConditional(conditional):
+    # Fields gated on the same condition share a single parsed conditional,
+    # kept by the hashable form of the conditional in the generation context
+    internedConditionals = generation_context.current().internedConditionals
+    key = _freezeConditional(conditional)
+    if key not in internedConditionals:
+        tokens = processConditional(conditional)
+        internedConditionals.setdefault(key, conditionals.Conditional(tokens) if len(tokens) > 0 else None)
+    return internedConditionals[key]
+
 def processObjectsFile(file, scope):
+    return processObjectsList(json_backend.loadFile(file), scope)
+
+def processObjectsList(objectsList, scope):
     objectsDictionary = {}
-    with open(file, "r+") as file:
-        objectsList = json.load(file)
     for object in objectsList:
         if "logWithParent" in object:
             newObject = objects.Object(object["name"], object["reference"], object["notes"], object["logIndependently"], object["referenceCount"], scope, object["logWithParent"])
@@ -215,13 +374,13 @@ def processObjectsFile(file, scope):
                 newObject.addDependency(newDependency)
         for field in object["fields"]:
             if "scope" in field:
-                newField = objects.ObjectField(field["name"], field["description"], field["type"], field["scope"])
+                newField = objects.ObjectField(field["name"], field["description"], _interned(field["type"]), field["scope"])
             else:
-               newField = objects.ObjectField(field["name"], field["description"], field["type"]) 
+               newField = objects.ObjectField(field["name"], field["description"], _interned(field["type"])) 
             if "referenceType" in field:
-                newField.referenceType = field["referenceType"]
+                newField.referenceType = _interned(field["referenceType"])
             if "elementType" in field:
-                newField.elementType = field["elementType"]
+                newField.elementType = _interned(field["elementType"])
             if "until" in field:
                 newField.until = field["until"]
             if "size" in field:
@@ -249,17 +408,18 @@ def processObjectsFile(file, scope):
                     newInput = inputs.Input(input["source"], minus)
                     newField.addInput(newInput)
             if "endianness" in field:
-                newField.endianness = field["endianness"]
+                newField.endianness = _interned(field["endianness"])
             if "conditional" in field:
-                newField.conditional = processConditional(field["conditional"])
+                newField.conditional = internConditional(field["conditional"])
             newObject.addField(newField)
         objectsDictionary[object["name"]] = newObject
     return objectsDictionary
 
 def processSwitchFile(file):
+    return processSwitchList(json_backend.loadFile(file))
+
+def processSwitchList(switchList):
     switchDictionary = {}
-    with open(file, "r+") as file:
-        switchList = json.load(file)
     for switch in switchList:
         newSwitch = switches.Switch(switch["name"], switch["referenceCount"])
         newDependency = createDependencyFromJSON(switch["dependsOn"])
@@ -270,7 +430,7 @@ def processSwitchFile(file):
                 newSwitch.addAdditionalDependsOn(newAdditionalDependency)
         for option in switch["options"]:
             newSwitchOption = switches.SwitchOption(option["value"])
-            newSwitchAction = switches.SwitchAction(option["action"]["name"], option["action"]["type"], option["action"]["referenceType"] if "referenceType" in option["action"] else "", option["action"]["scope"] if "scope" in option["action"] else "")
+            newSwitchAction = switches.SwitchAction(option["action"]["name"], _interned(option["action"]["type"]), _interned(option["action"]["referenceType"]) if "referenceType" in option["action"] else "", option["action"]["scope"] if "scope" in option["action"] else "")
             if "size" in option["action"]:
                 newSwitchAction.size = option["action"]["size"]
             if "inputs" in option["action"]:
@@ -281,14 +441,14 @@ def processSwitchFile(file):
                     newInput = inputs.Input(input["source"], minus)
                     newSwitchAction.addInput(newInput)
             if "elementType" in option["action"]:
-                newSwitchAction.elementType = option["action"]["elementType"]
+                newSwitchAction.elementType = _interned(option["action"]["elementType"])
             if "until" in option["action"]:
                 newSwitchAction.until = option["action"]["until"]
             newSwitchOption.action = newSwitchAction
             newSwitch.addOption(newSwitchOption)
         if "default" in switch:
             tempAction = switch["default"]
-            defaultAction = switches.SwitchAction(tempAction["name"], tempAction["type"], tempAction["referenceType"] if "referenceType" in tempAction else "", tempAction["scope"] if "scope" in tempAction else "")
+            defaultAction = switches.SwitchAction(tempAction["name"], _interned(tempAction["type"]), _interned(tempAction["referenceType"]) if "referenceType" in tempAction else "", tempAction["scope"] if "scope" in tempAction else "")
             if "size" in tempAction:
                 defaultAction.size = tempAction["size"]
             if "inputs" in tempAction:
@@ -299,7 +459,7 @@ def processSwitchFile(file):
                     newInput = inputs.Input(input["source"], minus)
                     defaultAction.addInput(newInput)
             if "elementType" in tempAction:
-                defaultAction.elementType = tempAction["elementType"]
+                defaultAction.elementType = _interned(tempAction["elementType"])
             if "until" in tempAction:
                 defaultAction.until = tempAction["until"]
             newSwitch.default = defaultAction
@@ -307,20 +467,21 @@ def processSwitchFile(file):
     return switchDictionary
         
 def processBitfieldFile(file):
+    return processBitfieldList(json_backend.loadFile(file))
+
+def processBitfieldList(bitfieldList):
     bitfieldDictionary = {}
-    with open(file, "r+") as file:
-        bitfieldList = json.load(file)
     for bitfield in bitfieldList:
         newBitfield = bitfields.Bitfield(bitfield["name"], bitfield["reference"], bitfield["notes"], bitfield["size"])
         if "endianness" in bitfield:
-            newBitfield.endianness = bitfield["endianness"]
+            newBitfield.endianness = _interned(bitfield["endianness"])
         for field in bitfield["fields"]:
             if "scope" in field:
-                newField = bitfields.BitfieldField(field["name"], field["description"], field["type"], field["bits"], field["scope"])
+                newField = bitfields.BitfieldField(field["name"], field["description"], _interned(field["type"]), field["bits"], field["scope"])
             else:
-               newField = bitfields.BitfieldField(field["name"], field["description"], field["type"], field["bits"]) 
+               newField = bitfields.BitfieldField(field["name"], field["description"], _interned(field["type"]), field["bits"]) 
             if "referenceType" in field:
-                newField.referenceType = field["referenceType"]
+                newField.referenceType = _interned(field["referenceType"])
             if "notes" in field:
                 newField.notes = field["notes"]
             newBitfield.addField(newField)
@@ -328,7 +489,7 @@ def processBitfieldFile(file):
     return bitfieldDictionary
     
 def _processBasicType(zeekFields, zeekField, object, field, type):
-    zeekField.name = utils.commandNameToConst(object.name).lower() + "_" + utils.commandNameToConst(field.name).lower()
+    zeekField.name = utils.commandNameToConstLower(object.name) + "_" + utils.commandNameToConstLower(field.name)
     zeekField.type =  type
     zeekFields.append(zeekField)
     object.addIncludedField(field)
@@ -345,7 +506,7 @@ def _processSwitchAction(type, action, zeekFields, object, linkingFields, scope,
             object.addExcludedField(action.name)
     elif action.type in utils.spicyToZeek:
         zeekField = zeektypes.ZeekField()
-        zeekField.name = utils.commandNameToConst(object.name).lower() + "_" + utils.commandNameToConst(action.name).lower()
+        zeekField.name = utils.commandNameToConstLower(object.name) + "_" + utils.commandNameToConstLower(action.name)
         _processBasicType(zeekFields, zeekField, object, action, utils.spicyToZeek[action.type])
     elif action.type == "list":
         _processListType(zeekFields, action, linkingFields, object, scope, scopes, allObjects, zeekObjects, zeekMainFileObject)
@@ -360,10 +521,7 @@ def _processSwitchType(zeekFields, linkingFields, object, field, scope, scopes,
         print("Unknown switch")
         print(field.name)
     elif switchType == "link":
-        for switchScope in scopes: 
-            if field.referenceType in allSwitches[utils.normalizedScope(switchScope, "")]:
-                referencedObject = allSwitches[utils.normalizedScope(switchScope, "")][field.referenceType]
-                break
+        _, _, referencedObject = utils.findSymbol("switch", field.referenceType)
         spicyFieldName = referencedObject.dependsOn.name[0].lower() + referencedObject.dependsOn.name[1:] + "LinkID"
         linkObjectField = objects.Link(spicyFieldName, "parentLinkId")
         object.addLinkField(linkObjectField)
@@ -372,15 +530,11 @@ def _processSwitchType(zeekFields, linkingFields, object, field, scope, scopes,
             _processSwitchAction("link", option.action, zeekFields, object, linkingFields, scope, scopes, allObjects, zeekObjects, zeekMainFileObject)
         if referencedObject.default is not None:
             _processSwitchAction("link", referencedObject.default, zeekFields, object, linkingFields, scope, scopes, allObjects, zeekObjects, zeekMainFileObject)
-        linkFieldName = utils.commandNameToConst(referencedObject.dependsOn.name).lower() + "_link_id"
+        linkFieldName = utils.commandNameToConstLower(referencedObject.dependsOn.name) + "_link_id"
         zeekLinkingField = zeektypes.ZeekField(linkFieldName, "string")
         linkingFields.append(zeekLinkingField)
     elif switchType == "contained":
-        referencedObject = None
-        for switchScope in scopes: 
-            if field.referenceType in allSwitches[utils.normalizedScope(switchScope, "")]:
-                referencedObject = allSwitches[utils.normalizedScope(switchScope, "")][field.referenceType]
-                break
+        _, _, referencedObject = utils.findSymbol("switch", field.referenceType)
         if referencedObject is not None:
             for option in referencedObject.options:
                 _processSwitchAction("contained", option.action, zeekFields, object, linkingFields, scope, scopes, allObjects, zeekObjects, zeekMainFileObject)
@@ -388,24 +542,17 @@ def _processSwitchType(zeekFields, linkingFields, object, field, scope, scopes,
                 _processSwitchAction("contained", referencedObject.default, zeekFields, object, linkingFields, scope, scopes, allObjects, zeekObjects, zeekMainFileObject)
     elif switchType == "trivial":
         # If a trivial switch is in an object that also contains fields, the switch objects should be logged with their parent
-        referencedObject = None
-        for switchScope in scopes: 
-            if field.referenceType in allSwitches[utils.normalizedScope(switchScope, "")]:
-                referencedObject = allSwitches[utils.normalizedScope(switchScope, "")][field.referenceType]
-                break
+        _, _, referencedObject = utils.findSymbol("switch", field.referenceType)
         if referencedObject is not None:
             for option in referencedObject.options:
                 if option.action.type == "object":
-                    for objectScope in scopes:
-                        if option.action.referenceType in allObjects[utils.normalizedScope(objectScope, "")]:
-                            actionObject = allObjects[utils.normalizedScope(objectScope, "")][option.action.referenceType]
-                            break
+                    _, _, actionObject = utils.findSymbol("object", option.action.referenceType)
                     if actionObject is not None:
                         actionObject.logWithParent = True
                             
 def _processBitsType(zeekFields, object, field, bitfields, scope, generalScope):
     referenceType = field.referenceType
-    fieldZeekName = utils.commandNameToConst(object.name).lower() + "_" +  utils.commandNameToConst(field.name).lower()
+    fieldZeekName = utils.commandNameToConstLower(object.name) + "_" +  utils.commandNameToConstLower(field.name)
     try:
         reference = bitfields[scope][referenceType]
     except KeyError:
@@ -416,7 +563,7 @@ def _processBitsType(zeekFields, object, field, bitfields, scope, generalScope):
             return
     for bitField in reference.fields:
         zeekType = utils.spicyToZeek[bitField.type]
-        fieldName = fieldZeekName + "_" + utils.commandNameToConst(bitField.name).lower()
+        fieldName = fieldZeekName + "_" + utils.commandNameToConstLower(bitField.name)
         zeekBitField = zeektypes.ZeekField(fieldName, zeekType)
         zeekFields.append(zeekBitField)
     object.addIncludedField(field)
@@ -432,7 +579,7 @@ def _processObjectLink(logStructure, zeekObjects, scope, zeekMainFileObject):
     
     
 def _processLinkingField(referencedObject, linkingFields, zeekObjects, scope, zeekMainFileObject):
-    linkFieldName = utils.commandNameToConst(referencedObject.name).lower() + "_link_id"
+    linkFieldName = utils.commandNameToConstLower(referencedObject.name) + "_link_id"
     zeekLinkingField = zeektypes.ZeekField(linkFieldName, "string")
     linkingFields.append(zeekLinkingField)
     for logStructure in referencedObject.zeekStructure:
@@ -445,10 +592,7 @@ def _processObjectType(field, linkingFields, object, allObjects, generalScope, s
         referencedObject = allObjects[generalScope][field.referenceType]
     elif field.referenceType not in scopedObjects:
         print("Referencing out of scope object")
-        for objectScope in scopes: 
-            if field.referenceType in allObjects[utils.normalizedScope(objectScope, "object")]:
-                referencedObject = allObjects[utils.normalizedScope(objectScope, "object")][field.referenceType]
-                break
+        _, _, referencedObject = utils.findSymbol("object", field.referenceType)
         if referencedObject == None:
             print("Unknown Reference: {}".format(field.referenceType))
             return
@@ -464,12 +608,11 @@ def _processObjectType(field, linkingFields, object, allObjects, generalScope, s
         referencedObject.addLinkField(linkEndObjectField)
         object.addExcludedField(field)  
         object.needsSpecificExport = True
-        # TODO: Double check this function for side effects
         _processLinkingField(referencedObject, linkingFields, zeekObjects, scope, zeekMainFileObject)
         
 def _processListType(zeekFields, field, linkingFields, object, scope, scopes, allObjects, zeekObjects, zeekMainFileObject):
     if field.elementType in utils.spicyToZeek:
-        zeekFieldName = utils.commandNameToConst(object.name).lower() + "_" +  utils.commandNameToConst(field.name).lower()
+        zeekFieldName = utils.commandNameToConstLower(object.name) + "_" +  utils.commandNameToConstLower(field.name)
         zeekType = "vector of {}".format(utils.spicyToZeek[field.elementType])
         zeekBitField = zeektypes.ZeekField(zeekFieldName, zeekType)
         object.addIncludedField(field)
@@ -491,10 +634,11 @@ def _processListType(zeekFields, field, linkingFields, object, scope, scopes, al
         _processLinkingField(referencedObject, linkingFields, zeekObjects, objectScope, zeekMainFileObject)
         
 def _linkScope(scope, zeekObjects):
-    if scope in utils.scopesHaveCrossScopeLinks:
+    scopesHaveCrossScopeLinks = generation_context.current().scopesHaveCrossScopeLinks
+    if scope in scopesHaveCrossScopeLinks:
         zeekMainObject = zeekObjects[utils.normalizedScope(scope, "object")][scope]
-        for item in utils.scopesHaveCrossScopeLinks[scope]:
-            zeekLinkingField = zeektypes.ZeekField(utils.commandNameToConst(item).lower(), "string")
+        for item in scopesHaveCrossScopeLinks[scope]:
+            zeekLinkingField = zeektypes.ZeekField(utils.commandNameToConstLower(item), "string")
             zeekMainObject.addExternalLinkFields(zeekLinkingField)
 
 def createZeekObjects(scopes, customFieldTypes, bitfields, allObjects, allSwitches):
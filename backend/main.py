@@ -3,36 +3,64 @@
 import argparse
 
 import utils
+import generation_context
 import json_processing as processing
 import graphing
+import il_bundle
 
 import generation_utils
 import config
 
-def _updateUtilValues(configuration):
-    utils.PROTOCOL_NAME = configuration.protocol
-    utils.USES_LAYER_2 = configuration.usesLayer2
-    utils.customFieldTypes = configuration.customFieldTypes
+def _useGenerationContext(configuration):
+    # The command line generates a single protocol, so its context stays
+    # current for the rest of the run
+    generation_context.setCurrent(generation_context.createContextFromConfiguration(configuration))
     
 def _parseArgs():
     parser = argparse.ArgumentParser()
-    parser.add_argument("inputRootDirectory", type=str, help="Path to folder with '{0}' folder".format(utils.DEFAULT_SCOPE))
+    parser.add_argument("inputRootDirectory", type=str, help="Path to folder with '{0}' folder or to an intermediate language bundle".format(utils.DEFAULT_SCOPE))
     parser.add_argument("outputRootDirectory", type=str, help="Root output directory")
+    parser.add_argument("--enumerate-cycles", action="store_true", help="List every elementary cycle instead of using strongly connected components (slow on recursive protocols)")
+    parser.add_argument("--path-budget", type=int, default=generation_utils.DEFAULT_PATH_BUDGET, help="Maximum number of paths to walk inside of cycles when calculating logging parents")
+    parser.add_argument("--approximate-paths", action="store_true", help="Approximate logging parents inside of cycles instead of stopping when the path budget is exceeded")
+    parser.add_argument("--graph-cache", type=str, default=None, help="Folder used to cache graph analysis results between runs")
+    parser.add_argument("--path-workers", type=int, default=1, help="Number of processes used to calculate logging parents")
+    parser.add_argument("--write-workers", type=int, default=None, help="Number of threads used to generate the files of the scopes")
+    parser.add_argument("--dump-graph", type=str, default=None, help="Folder to write the graph, paths and cycles to for debugging")
+    parser.add_argument("--prune-unreachable", action="store_true", help="Skip objects, switches, bitfields and enums that can not be reached from the EntryPoint")
+    parser.add_argument("--lazy-scopes", action="store_true", help="Only load the scopes that are referenced from the EntryPoint")
 
     args = parser.parse_args()
 
-    return (args.inputRootDirectory, args.outputRootDirectory)
+    return (args.inputRootDirectory, args.outputRootDirectory, args.enumerate_cycles, args.path_budget, args.approximate_paths, args.graph_cache, args.prune_unreachable, args.path_workers, args.dump_graph, args.lazy_scopes, args.write_workers)
     
-def _generateData(inRootFolder, configuration, entryPointScope, entryPointName, entryPointKey):
+def _generateData(inRootFolder, configuration, entryPointScope, entryPointName, entryPointKey, enumerateCycles=False, pathBudget=generation_utils.DEFAULT_PATH_BUDGET, approximatePaths=False, graphCacheFolder=None, pruneUnreachable=False, pathWorkers=1, graphDumpFolder=None, lazyScopes=False):
     ############################################################################
     # Process the data files
     ############################################################################    
-    objects, switches, bitfields, enums = processing.loadFiles(inRootFolder, configuration.scopes)
+    if lazyScopes:
+        # Scopes that are never referenced are treated as if they were not
+        # configured, so no output is generated for them either
+        loadedScopes, loadedFiles = processing.loadReachableScopeFiles(inRootFolder, configuration.scopes, entryPointScope, entryPointName)
+        print("Loaded {0} of {1} scopes".format(len(loadedScopes), len(configuration.scopes)))
+        configuration.scopes = loadedScopes
+        objects, switches, bitfields, enums = loadedFiles
+    else:
+        objects, switches, bitfields, enums = processing.loadFiles(inRootFolder, configuration.scopes)
+    
+    if pruneUnreachable:
+        prunedStructures = generation_utils.pruneUnreachableStructures(configuration, objects, switches, bitfields, enums, entryPointKey)
+        generation_utils.printPruneReport(prunedStructures)
+
+    # Resolve references by name without scanning every scope
+    generation_context.current().symbolIndex.update(utils.buildSymbolIndex(configuration.scopes, objects, switches, bitfields, enums))
                
     ############################################################################
     # Use some Graph Theory to our advantage
     ############################################################################                       
-    generation_utils.createAndUseGraphInformation(configuration, objects, switches, bitfields, enums, entryPointScope, entryPointName, entryPointKey)
+    if not generation_utils.createAndUseGraphInformation(configuration, objects, switches, bitfields, enums, entryPointScope, entryPointName, entryPointKey, enumerateCycles, pathBudget, approximatePaths, graphCacheFolder, pathWorkers, graphDumpFolder):
+        print("Path budget exceeded; raise --path-budget or use --approximate-paths")
+        exit(3)
         
     ############################################################################
     # Work with the loaded data
@@ -52,7 +80,7 @@ def determineEntryPointInformation(configuration):
 
     entryPointScope = entryPointParts[0]
     entryPointName = entryPointParts[1]
-    entryPointKey = graphing.normalizedKey3(utils.normalizedScope(entryPointScope, "object"), "object", entryPointName)
+    entryPointKey = graphing.structureNode(utils.normalizedScope(entryPointScope, "object"), "object", entryPointName)
     
     return (True, entryPointScope, entryPointName, entryPointKey)
     
@@ -62,19 +90,33 @@ if __name__ == "__main__":
     ############################################################################
     # Parse Command Line Arguments
     ############################################################################
-    inRootFolder, outRootFolder = _parseArgs()
+    inRootFolder, outRootFolder, enumerateCycles, pathBudget, approximatePaths, graphCacheFolder, pruneUnreachable, pathWorkers, graphDumpFolder, lazyScopes, writeWorkers = _parseArgs()
 
     ############################################################################
     # Load the configuration file
     ############################################################################    
-    configPath = os.path.join(inRootFolder, utils.DEFAULT_SCOPE, "config.json")
-    
-    loadSuccessful, configuration = config.loadConfig(configPath)
-    if not loadSuccessful:
-        print(configPath + " is a required file")
+    bundle = None
+    if il_bundle.isBundle(inRootFolder):
+        # The scopes are read from the bundle instead of the scope folders
+        try:
+            bundle = il_bundle.Bundle(inRootFolder)
+        except ValueError as error:
+            print(error)
+            exit(1)
+        configuration = config.loadConfigObject(bundle.loadConfig())
+        inRootFolder = bundle
+    elif os.path.isfile(inRootFolder):
+        print(inRootFolder + " is neither a folder nor a parsnip bundle")
         exit(1)
+    else:
+        configPath = os.path.join(inRootFolder, utils.DEFAULT_SCOPE, "config.json")
+        
+        loadSuccessful, configuration = config.loadConfig(configPath)
+        if not loadSuccessful:
+            print(configPath + " is a required file")
+            exit(1)
         
-    _updateUtilValues(configuration)
+    _useGenerationContext(configuration)
     
     entryPointParsingSuccessful, entryPointScope, entryPointName, entryPointKey = determineEntryPointInformation(configuration)
     
@@ -87,7 +129,12 @@ if __name__ == "__main__":
     ############################################################################
     # Load and work with data
     ############################################################################
-    zeekTypes, zeekMainFileObject, crossScopeItems, bitfields, enums, objects, switches = _generateData(inRootFolder, configuration, entryPointScope, entryPointName, entryPointKey)
+    try:
+        zeekTypes, zeekMainFileObject, crossScopeItems, bitfields, enums, objects, switches = _generateData(inRootFolder, configuration, entryPointScope, entryPointName, entryPointKey, enumerateCycles, pathBudget, approximatePaths, graphCacheFolder, pruneUnreachable, pathWorkers, graphDumpFolder, lazyScopes)
+    finally:
+        # Everything needed has been decoded from the bundle by now
+        if bundle is not None:
+            bundle.close()
 
     ############################################################################
     # Generate output
@@ -97,4 +144,5 @@ if __name__ == "__main__":
                                       crossScopeItems,
                                       bitfields, enums,
                                       objects, switches,
-                                      entryPointScope, entryPointName)
+                                      entryPointScope, entryPointName,
+                                      writeWorkers)
@@ -1,19 +1,30 @@
 # Copyright 2024, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
 
 import utils
+import generation_context
+import emitter
 import events
 import json_processing
 
 #ADD_DEBUG=True
 ADD_DEBUG=False
 
+# Stand-ins for the parts of a nested object's event backend that depend on
+# where the object is used
+_PREFIX_PLACEHOLDER = "\x00prefix\x00"
+_VARIABLE_PLACEHOLDER = "\x00variable\x00"
+
 class Link:
+    __slots__ = ("name", "parameterName", "isEndLink")
+
     def __init__(self, name, parameterName, isEndLink = False):
         self.name = name
         self.parameterName = parameterName
         self.isEndLink = isEndLink
 
 class ObjectField:
+    __slots__ = ("name", "description", "notes", "type", "referenceType", "elementType", "size", "inputs", "until", "scope", "conditional", "endianness")
+
     def __init__(self, name, description, type, scope = ""):
         self.name = name
         self.description = description
@@ -25,7 +36,7 @@ class ObjectField:
         self.inputs = []
         self.until = None
         self.scope = utils.normalizedScope(scope, type)
-        self.conditional = []
+        self.conditional = None
         self.endianness = "big"
         
     def addInput(self, input):
@@ -35,37 +46,30 @@ class ObjectField:
         if input not in self.inputs:
             self.inputs.append(input)
 
+    def _conditionalEnumPrefixes(self, dependsOn, fields):
+        # Values compared against an enum indicator have to be qualified with
+        # the enum's scope and type
+        enumPrefixes = []
+        for indicator in self.conditional.indicators:
+            enumPrefix = None
+            dependency = next((value for value in dependsOn if value.name == indicator[1]), None)
+            if dependency is not None and "enum" == dependency.type:
+                enumPrefix = "{0}::{1}".format(dependency.scope, dependency.referenceType)
+            else:
+                field = next((value for value in fields if value.name == indicator[1]), None)
+                if field is not None and "enum" == field.type:
+                    enumPrefix = "{0}::{1}".format(field.scope, field.referenceType)
+            enumPrefixes.append(enumPrefix)
+        return tuple(enumPrefixes)
+
     def createSpicyString(self, columns, customTypes, bitfields, switches, enums, dependsOn, fields):
         outputString = ""
         if self.notes is not None and "" != self.notes:
             outputString += "# {0}\n{1}".format(self.notes, utils.SINGLE_TAB)
         varString, typeString = utils.determineSpicyStringForType(self.name, self.type, self.elementType, self.referenceType, self.scope, self.size, self.inputs, self.until, columns + 4, customTypes, bitfields, switches, enums)
         conditionalString = ""
-        if len(self.conditional) > 0:
-            conditionalStringBuilder = self.conditional[:]
-            for index in range(len(conditionalStringBuilder)):
-                # Get the type and value
-                entryType = conditionalStringBuilder[index][0]
-                entryValue = conditionalStringBuilder[index][1]
-                entryAssociatedValue = None
-                if len(conditionalStringBuilder[index]) > 2:
-                    entryAssociatedValue = conditionalStringBuilder[index][2]
-                if "operator" == entryType and "=" == entryValue:
-                    if "=" == entryValue:
-                        # conditionalStringBuilder[index][1] = "=="
-                        conditionalStringBuilder[index] = (conditionalStringBuilder[index][0], "==")
-                elif "indicator" == entryType:
-                    # See if we need to handle the value differently:
-                    dependsOnIndex = next((index for index, value in enumerate(dependsOn) if value.name == entryValue), -1)
-                    if -1 != dependsOnIndex and "enum" == dependsOn[dependsOnIndex].type and entryAssociatedValue is not None:
-                        conditionalStringBuilder[entryAssociatedValue] = (conditionalStringBuilder[entryAssociatedValue][0], "{0}::{1}::{2}".format(dependsOn[dependsOnIndex].scope, dependsOn[dependsOnIndex].referenceType, conditionalStringBuilder[entryAssociatedValue][1]))
-                    else:
-                        fieldsIndex = next((index for index, value in enumerate(fields) if value.name == entryValue), -1)
-                        if -1 != fieldsIndex and "enum" == fields[fieldsIndex].type and entryAssociatedValue is not None:
-                            conditionalStringBuilder[entryAssociatedValue] = (conditionalStringBuilder[entryAssociatedValue][0], "{0}::{1}::{2}".format(fields[fieldsIndex].scope, fields[fieldsIndex].referenceType, conditionalStringBuilder[entryAssociatedValue][1]))
-            for entry in conditionalStringBuilder:
-                conditionalString += str(entry[1])
-            conditionalString = " if ({0})".format(conditionalString)
+        if self.conditional is not None:
+            conditionalString = " if ({0})".format(self.conditional.createSpicyString(self._conditionalEnumPrefixes(dependsOn, fields)))
         if "little" == self.endianness:
             conditionalString += " &byte-order=spicy::ByteOrder::Little"
         if "switch" == self.type:
@@ -139,42 +143,38 @@ class Object:
         self.linkIds.append(field)
             
     def createSpicyString(self, customTypes, bitfields, switches, enums, isPublic = False):
-        outputString = ""
+        output = emitter.Emitter()
         if self.reference is not None and "" != self.reference:
-            outputString += "# {0}\n".format(self.reference)
+            output.write("# {0}\n".format(self.reference))
         if isPublic:
-            outputString += "public "
+            output.write("public ")
         dependsPart = ""
         if 0 < len(self.dependsOn):
-            dependsPart += " ("
-            for index, depends in enumerate(self.dependsOn):
+            dependsParts = []
+            for depends in self.dependsOn:
                 if depends.type == "enum":
                     typeString = "{0}::{1}".format(depends.scope, depends.referenceType)
                 else:
                     _, typeString = utils.determineSpicyStringForType(depends.name, depends.type, None, depends.referenceType, depends.scope, depends.size, [], None, self.column, customTypes, bitfields, switches, enums)
-                dependsPart += "{0} : {1}".format(depends.name, typeString)
-                if index < len(self.dependsOn) - 1:
-                    dependsPart += ", "
-            dependsPart += ")"
-        outputString += "type {0} = unit{1} {{\n".format(self.name, dependsPart)
+                dependsParts.append("{0} : {1}".format(depends.name, typeString))
+            dependsPart = " ({0})".format(", ".join(dependsParts))
+        output.write("type {0} = unit{1} {{\n".format(self.name, dependsPart))
         if self.linkIds != []:
-            varDeclarationString = ""
-            initFunctionString = "{}on %init() {{\n".format(utils.SINGLE_TAB)
             for link in self.linkIds:
-                varDeclarationString += "{}var {} : string;\n".format(utils.SINGLE_TAB, link.name)
+                output.line(1, "var {} : string;".format(link.name))
+            output.line(1, "on %init() {")
+            for link in self.linkIds:
                 if link.isEndLink:
-                    initFunctionString += "{}self.{} = {};\n".format(utils.DOUBLE_TAB, link.name, link.parameterName)
+                    output.line(2, "self.{} = {};".format(link.name, link.parameterName))
                 else:
-                    initFunctionString += "{}self.{} = {}_{}::generateId();\n".format(utils.DOUBLE_TAB, link.name, utils.PROTOCOL_NAME.upper(), utils.ID_SCOPE.upper())
-            initFunctionString += "{}}}\n".format(utils.SINGLE_TAB)
-            outputString += varDeclarationString
-            outputString += initFunctionString
+                    output.line(2, "self.{} = {}_{}::generateId();".format(link.name, generation_context.current().protocolName.upper(), utils.ID_SCOPE.upper()))
+            output.line(1, "}")
         for field in self.fields:
-            outputString += "{0}{1}\n".format(utils.SINGLE_TAB, field.createSpicyString(self.column, customTypes, bitfields, switches, enums, self.dependsOn, self.fields))
+            output.line(1, field.createSpicyString(self.column, customTypes, bitfields, switches, enums, self.dependsOn, self.fields))
         if ADD_DEBUG:
-            outputString += "{0}on %done(){{print self;}}\n".format(utils.SINGLE_TAB)
-        outputString += "};\n"
-        return outputString
+            output.line(1, "on %done(){print self;}")
+        output.write("};\n")
+        return output.getValue()
 
     def getEvent(self, moduleName):
         if self.logWithParent and not self.logIndependently:
@@ -205,84 +205,67 @@ class Object:
             processingName = itemPrefix + "$"
         return processingName
         
-    def _adjustForNonFields(self, moduleName, zeekStructureName, allBitfields, tabSize):
+    def _adjustForNonFields(self, output, moduleName, zeekStructureName, allBitfields, tabSize):
+        context = generation_context.current()
         event = self.getEvent(moduleName)
         localVariableName = "info_{}".format(zeekStructureName.lower())
-        convertingFunctionString = event.getEventFunctionName(allBitfields)
-        if not utils.USES_LAYER_2:
-            convertingFunctionString += "{}hook set_session_{}(c);\n\n".format(utils.getTabString(tabSize), zeekStructureName.lower())
-            convertingFunctionString += "{}local {} = c${}_{};\n\n".format(utils.getTabString(tabSize), localVariableName, utils.PROTOCOL_NAME.lower(), zeekStructureName.lower())
-        else: # utils.USES_LAYER_2:
-            convertingFunctionString += "{}local {} = {}($ts=network_time());\n".format(utils.getTabString(tabSize), localVariableName, zeekStructureName)
-        return (localVariableName, convertingFunctionString)
+        output.write(event.getEventFunctionName(allBitfields))
+        if not context.usesLayer2:
+            output.write("{}hook set_session_{}(c);\n\n".format(utils.getTabString(tabSize), zeekStructureName.lower()))
+            output.write("{}local {} = c${}_{};\n\n".format(utils.getTabString(tabSize), localVariableName, context.protocolName.lower(), zeekStructureName.lower()))
+        else: # context.usesLayer2:
+            output.line(tabSize, "local {} = {}($ts=network_time());".format(localVariableName, zeekStructureName))
+        return localVariableName
         
-    def _finishForNonFields(self, localVariableName, tabSize, zeekStructureName):
+    def _finishForNonFields(self, output, localVariableName, tabSize, zeekStructureName):
+        context = generation_context.current()
         argument = "c"
-        if utils.USES_LAYER_2:
+        if context.usesLayer2:
             argument = localVariableName
-        convertingFunctionString = "{}{}::emit_{}_{}({});\n".format(utils.getTabString(tabSize), utils.PROTOCOL_NAME.upper(), utils.PROTOCOL_NAME.lower(), zeekStructureName.lower(), argument)
-        convertingFunctionString += "}\n"
-        return convertingFunctionString
+        output.line(tabSize, "{}::emit_{}_{}({});".format(context.protocolName.upper(), context.protocolName.lower(), zeekStructureName.lower(), argument))
+        output.write("}\n")
         
-    def _getLinkIDConvertingFunctions(self, tabSize, localVariableName, processingName):
-        convertingFunctionString = ""
+    def _getLinkIDConvertingFunctions(self, output, tabSize, localVariableName, processingName):
         for linkId in self.linkIds:
-            convertingFunctionString += "{}{}${} = {}{};\n".format(utils.getTabString(tabSize), localVariableName, utils.commandNameToConst(linkId.name).lower(), processingName, linkId.name)
-        return convertingFunctionString
+            output.line(tabSize, "{}${} = {}{};".format(localVariableName, utils.commandNameToConstLower(linkId.name), processingName, linkId.name))
         
-    def _updateOnConditionals(self, startingTabSize, field, specificExportOverride, processingName):
+    def _updateOnConditionals(self, output, startingTabSize, field, specificExportOverride, processingName):
         tabSize = startingTabSize
-        convertingFunctionString = ""
-        if len(field.conditional) > 0:
+        if field.conditional is not None:
             if self.needsSpecificExport and not specificExportOverride:
                 pass
             else:
-                convertingFunctionString += "{}if ({}?${}){{\n".format(utils.getTabString(tabSize), processingName[:-1], field.name)
+                output.line(tabSize, "if ({}?${}){{".format(processingName[:-1], field.name))
                 tabSize = startingTabSize + 1
-        return (tabSize, convertingFunctionString)
+        return tabSize
         
-    def _finishOnConditionals(self, field, specificExportOverride, tabSize):
-        if len(field.conditional) > 0 and (not self.needsSpecificExport or specificExportOverride):
-            return "{}}}\n".format(utils.getTabString(tabSize - 1))
-        return ""
+    def _finishOnConditionals(self, output, field, specificExportOverride, tabSize):
+        if field.conditional is not None and (not self.needsSpecificExport or specificExportOverride):
+            output.line(tabSize - 1, "}")
         
-    def _makeEventBackendForBits(self, field, scopes, allBitfields, allEnums, specificExportOverride, localVariableName, processingName, tabSize):
+    def _makeEventBackendForBits(self, output, field, scopes, allBitfields, allEnums, specificExportOverride, localVariableName, processingName, tabSize):
         referenceType = field.referenceType
-        fieldPrefix = utils.commandNameToConst(self.name).lower() + "_" +  utils.commandNameToConst(field.name).lower()
-        referencedBitfield = None
-        for scope in scopes:
-            if referenceType in allBitfields[utils.normalizedScope(scope, "bitfield")]:
-                referencedBitfield = allBitfields[utils.normalizedScope(scope, "bitfield")][referenceType]
-                break
-        convertingFunctionString = ""
+        fieldPrefix = utils.commandNameToConstLower(self.name) + "_" +  utils.commandNameToConstLower(field.name)
+        _, _, referencedBitfield = utils.findSymbol("bitfield", referenceType)
         if referencedBitfield != None:
             for bitfieldItem in referencedBitfield.fields:
                 argument = bitfieldItem.name
                 if not self.needsSpecificExport or specificExportOverride:
                     argument = "{}{}${}".format(processingName, field.name, argument)
-                convertingFunctionString += "{}{}${}_{} = ".format(utils.getTabString(tabSize), localVariableName, fieldPrefix, utils.commandNameToConst(bitfieldItem.name).lower())
                 if bitfieldItem.type == "enum":
-                    for scope in scopes: 
-                        if bitfieldItem.referenceType in allEnums[utils.normalizedScope(scope, "enum")]:
-                            enumScope = utils.normalizedScope(scope, "enum")
-                            break
-                    convertingFunctionString += "{}::{}[{}]".format(enumScope, utils.commandNameToConst(bitfieldItem.referenceType).upper(), argument)
+                    _, enumScope, _ = utils.findSymbol("enum", bitfieldItem.referenceType)
+                    value = "{}::{}[{}]".format(enumScope, utils.commandNameToConstUpper(bitfieldItem.referenceType), argument)
                 else:
-                    convertingFunctionString += argument
-                convertingFunctionString += ";\n"
-        return convertingFunctionString
+                    value = argument
+                output.line(tabSize, "{}${}_{} = {};".format(localVariableName, fieldPrefix, utils.commandNameToConstLower(bitfieldItem.name), value))
         
-    def _makeEventBackendForEnum(self, field, scopes, allEnums, localVariableName, processingName, tabSize):
-        zeekName = utils.commandNameToConst(self.name).lower() + "_" + utils.commandNameToConst(field.name).lower()
-        for scope in scopes: 
-            if field.referenceType in allEnums[utils.normalizedScope(scope, "enum")]:
-                enumScope = utils.normalizedScope(scope, "enum")
-                break
-        return "{}{}${} = {}::{}[{}{}];\n".format(utils.getTabString(tabSize), localVariableName, zeekName, enumScope, utils.commandNameToConst(field.referenceType).upper(), processingName, field.name)
+    def _makeEventBackendForEnum(self, output, field, scopes, allEnums, localVariableName, processingName, tabSize):
+        zeekName = utils.commandNameToConstLower(self.name) + "_" + utils.commandNameToConstLower(field.name)
+        _, enumScope, _ = utils.findSymbol("enum", field.referenceType)
+        output.line(tabSize, "{}${} = {}::{}[{}{}];".format(localVariableName, zeekName, enumScope, utils.commandNameToConstUpper(field.referenceType), processingName, field.name))
         
-    def _makeEventBackendForList(self, field, processingName, tabSize, localVariableName, includeConditional = False):
-        convertingFunctionString = ""
-        zeekName = utils.commandNameToConst(self.name).lower() + "_" + utils.commandNameToConst(field.name).lower() 
+    def _makeEventBackendForList(self, output, field, processingName, tabSize, localVariableName, includeConditional = False):
+        zeekName = utils.commandNameToConstLower(self.name) + "_" + utils.commandNameToConstLower(field.name) 
         if field.elementType in utils.spicyToZeek:
             actionName = field.name
             if includeConditional:
@@ -290,119 +273,121 @@ class Object:
                     argument = "{}?${}".format(processingName[:-1], actionName)
                 else:
                     argument = actionName
-                convertingFunctionString += "{}if ({}){{\n".format(utils.getTabString(tabSize), argument)
-                convertingFunctionString += "{}{}${} = {}{};\n".format(utils.getTabString(tabSize + 1), localVariableName, zeekName, processingName, field.name)
-                convertingFunctionString += "{}}}\n".format(utils.getTabString(tabSize))
+                output.line(tabSize, "if ({}){{".format(argument))
+                output.line(tabSize + 1, "{}${} = {}{};".format(localVariableName, zeekName, processingName, field.name))
+                output.line(tabSize, "}")
             else:
-               convertingFunctionString += "{}{}${} = {}{};\n".format(utils.getTabString(tabSize), localVariableName, zeekName, processingName, field.name)
-            return convertingFunctionString
-        if field.elementType == "object":
-            return ""
-        else:
+                output.line(tabSize, "{}${} = {}{};".format(localVariableName, zeekName, processingName, field.name))
+        elif field.elementType != "object":
             print("Invalid List element of type {}".format(field.elementType))
-    def _makeEventBackendForObject(self, field, processingName, moduleName, allEnums, allBitfields, allObjects, allSwitches, scopes, localVariableName, startingTabSize, childOverride):
-        referencedObject = None
-        for scope in scopes:
-            if field.referenceType in allObjects[utils.normalizedScope(scope, "object")]:
-                referencedObject = allObjects[utils.normalizedScope(scope, "object")][field.referenceType]
-                break
+
+    def _makeEventBackendForObject(self, output, field, processingName, moduleName, allEnums, allBitfields, allObjects, allSwitches, scopes, localVariableName, startingTabSize, childOverride):
+        _, _, referencedObject = utils.findSymbol("object", field.referenceType)
         if referencedObject != None:
             objectZeekStructureName = processingName + field.name
-            return referencedObject.makeEventBackend(moduleName, objectZeekStructureName, allEnums, allBitfields, allObjects, allSwitches, scopes, False, localVariableName, objectZeekStructureName, startingTabSize, childOverride)
-        return ""
+            referencedObject._emitNestedEventBackend(output, moduleName, allEnums, allBitfields, allObjects, allSwitches, scopes, localVariableName, objectZeekStructureName, startingTabSize, childOverride)
         
-    def _makeEventBackendForSwitchAction(self, action, processingName, moduleName, allEnums, allBitfields, allObjects, allSwitches, scopes, localVariableName, startingTabSize, childOverride, tabSize):
-        convertingFunctionString = ""
+    def _makeEventBackendForSwitchAction(self, output, action, processingName, moduleName, allEnums, allBitfields, allObjects, allSwitches, scopes, localVariableName, startingTabSize, childOverride, tabSize):
         if action.type == "object":
             objectName = action.referenceType
-            for scope in scopes: 
-                if objectName in allObjects[utils.normalizedScope(scope, "")]:
-                    object = allObjects[utils.normalizedScope(scope, "")][objectName]
-                    argument = action.name
-                    if not self.needsSpecificExport or childOverride:
-                        argument = "{}?${}".format(processingName[:-1], argument)
-                    convertingFunctionString += "{}if ({}){{\n".format(utils.getTabString(tabSize), argument)
-                    objectZeekStructureName = processingName + action.name
-                    convertingFunctionString += object.makeEventBackend(moduleName, objectZeekStructureName, allEnums, allBitfields, allObjects, allSwitches, scopes, False, localVariableName, objectZeekStructureName, startingTabSize + 1, childOverride)
-                    convertingFunctionString += "{}}}\n".format(utils.getTabString(tabSize))
+            for _, _, object in utils.findSymbols("object", objectName):
+                argument = action.name
+                if not self.needsSpecificExport or childOverride:
+                    argument = "{}?${}".format(processingName[:-1], argument)
+                output.line(tabSize, "if ({}){{".format(argument))
+                objectZeekStructureName = processingName + action.name
+                object._emitNestedEventBackend(output, moduleName, allEnums, allBitfields, allObjects, allSwitches, scopes, localVariableName, objectZeekStructureName, startingTabSize + 1, childOverride)
+                output.line(tabSize, "}")
         elif action.type in utils.spicyToZeek:
             argument = action.name
-            zeekName = utils.commandNameToConst(self.name).lower() + "_" + utils.commandNameToConst(action.name).lower()
+            zeekName = utils.commandNameToConstLower(self.name) + "_" + utils.commandNameToConstLower(action.name)
             if not self.needsSpecificExport or childOverride:
                 argument = "{}?${}".format(processingName[:-1], argument)
-                convertingFunctionString += "{}if ({}){{\n".format(utils.getTabString(tabSize), argument)
+                output.line(tabSize, "if ({}){{".format(argument))
                 tabSize += 1
-            convertingFunctionString += "{}{}${} = {}{};\n".format(utils.getTabString(tabSize), localVariableName, zeekName, processingName, action.name)
+            output.line(tabSize, "{}${} = {}{};".format(localVariableName, zeekName, processingName, action.name))
             if not self.needsSpecificExport or childOverride:
                 tabSize -= 1
-                convertingFunctionString += "{}}}\n".format(utils.getTabString(tabSize))
+                output.line(tabSize, "}")
         elif action.type == "list":
             includeConditional = True
             if self.needsSpecificExport and not childOverride:
                 includeConditional = False
-            convertingFunctionString += self._makeEventBackendForList(action, processingName, tabSize, localVariableName, includeConditional)
+            self._makeEventBackendForList(output, action, processingName, tabSize, localVariableName, includeConditional)
         elif action.type == "void":
             pass
         else:
             print("Invalid switch option type: {} in {}".format(action.type, object.name))
-        return convertingFunctionString
         
-    def _makeEventBackendForSwitchOptions(self, switch, processingName, moduleName, allEnums, allBitfields, allObjects, allSwitches, scopes, localVariableName, startingTabSize, childOverride, tabSize):
-        convertingFunctionString = ""
+    def _makeEventBackendForSwitchOptions(self, output, switch, processingName, moduleName, allEnums, allBitfields, allObjects, allSwitches, scopes, localVariableName, startingTabSize, childOverride, tabSize):
         for item in switch.options:
-            convertingFunctionString += self._makeEventBackendForSwitchAction(item.action, processingName, moduleName, allEnums, allBitfields, allObjects, allSwitches, scopes, localVariableName, startingTabSize, childOverride, tabSize)
-        return convertingFunctionString
+            self._makeEventBackendForSwitchAction(output, item.action, processingName, moduleName, allEnums, allBitfields, allObjects, allSwitches, scopes, localVariableName, startingTabSize, childOverride, tabSize)
         
-    def _makeEventBackendForSwitchDefault(self, switch, processingName, moduleName, allEnums, allBitfields, allObjects, allSwitches, scopes, localVariableName, startingTabSize, childOverride, tabSize):
-        return self._makeEventBackendForSwitchAction(switch.default, processingName, moduleName, allEnums, allBitfields, allObjects, allSwitches, scopes, localVariableName, startingTabSize, childOverride, tabSize)
+    def _makeEventBackendForSwitchDefault(self, output, switch, processingName, moduleName, allEnums, allBitfields, allObjects, allSwitches, scopes, localVariableName, startingTabSize, childOverride, tabSize):
+        self._makeEventBackendForSwitchAction(output, switch.default, processingName, moduleName, allEnums, allBitfields, allObjects, allSwitches, scopes, localVariableName, startingTabSize, childOverride, tabSize)
         
-    def _makeEventBackendForSwitch(self, field, processingName, moduleName, allEnums, allBitfields, allObjects, allSwitches, scopes, localVariableName, startingTabSize, childOverride, tabSize):
-        convertingFunctionString = ""
-        for switchScope in scopes: 
-            if field.referenceType in allSwitches[utils.normalizedScope(switchScope, "")]:
-                switch = allSwitches[utils.normalizedScope(switchScope, "")][field.referenceType]
-                break
+    def _makeEventBackendForSwitch(self, output, field, processingName, moduleName, allEnums, allBitfields, allObjects, allSwitches, scopes, localVariableName, startingTabSize, childOverride, tabSize):
+        _, _, switch = utils.findSymbol("switch", field.referenceType)
         switchType = ""            
         if switch != None:
-            switchType = json_processing.getSwitchType(field.referenceType, field, self.scope, scopes, allObjects, allSwitches)
+            switchType = json_processing.determineSwitchType(field.referenceType, self.scope)
         if switchType == "contained":
-            convertingFunctionString = self._makeEventBackendForSwitchOptions(switch, processingName, moduleName, allEnums, allBitfields, allObjects, allSwitches, scopes, localVariableName, startingTabSize, childOverride, tabSize)
+            self._makeEventBackendForSwitchOptions(output, switch, processingName, moduleName, allEnums, allBitfields, allObjects, allSwitches, scopes, localVariableName, startingTabSize, childOverride, tabSize)
         
         if switch.default != None:
-            convertingFunctionString += self._makeEventBackendForSwitchDefault(switch, processingName, moduleName, allEnums, allBitfields, allObjects, allSwitches, scopes, localVariableName, startingTabSize, childOverride, tabSize)
-        return convertingFunctionString
+            self._makeEventBackendForSwitchDefault(output, switch, processingName, moduleName, allEnums, allBitfields, allObjects, allSwitches, scopes, localVariableName, startingTabSize, childOverride, tabSize)
                 
+    def _emitNestedEventBackend(self, output, moduleName, allEnums, allBitfields, allObjects, allSwitches, scopes, localVariableName, itemPrefix, startingTabSize, specificExportOverride):
+        # Shared objects, such as a common header, are generated once and only
+        # the prefix and the variable name are filled in for every other parent.
+        # The fragments are kept by (object, tab size, export override), and
+        # only for objects used more than once, so a long chain of objects that
+        # are each used once does not keep a copy of every sub-chain
+        context = generation_context.current()
+        key = (self, startingTabSize, specificExportOverride)
+        if key not in context.eventBackendUses:
+            context.eventBackendUses.add(key)
+            self.emitEventBackend(output, moduleName, itemPrefix, allEnums, allBitfields, allObjects, allSwitches, scopes, False, localVariableName, itemPrefix, startingTabSize, specificExportOverride)
+            return
+        template = context.eventBackendFragments.get(key)
+        if template is None:
+            fragment = emitter.Emitter()
+            self.emitEventBackend(fragment, moduleName, _PREFIX_PLACEHOLDER, allEnums, allBitfields, allObjects, allSwitches, scopes, False, _VARIABLE_PLACEHOLDER, _PREFIX_PLACEHOLDER, startingTabSize, specificExportOverride)
+            template = fragment.getValue()
+            context.eventBackendFragments[key] = template
+        output.write(template.replace(_PREFIX_PLACEHOLDER, itemPrefix).replace(_VARIABLE_PLACEHOLDER, localVariableName))
+
     def makeEventBackend(self, moduleName, zeekStructureName, allEnums, allBitfields, allObjects, allSwitches, scopes, includeNonFields = True, logObjectVariableName = "", itemPrefix = "", startingTabSize = 1, specificExportOverride=False):
-        if "TrimPoints" in self.name:
-            pass
-        convertingFunctionString = ""
+        output = emitter.Emitter()
+        self.emitEventBackend(output, moduleName, zeekStructureName, allEnums, allBitfields, allObjects, allSwitches, scopes, includeNonFields, logObjectVariableName, itemPrefix, startingTabSize, specificExportOverride)
+        return output.getValue()
+
+    def emitEventBackend(self, output, moduleName, zeekStructureName, allEnums, allBitfields, allObjects, allSwitches, scopes, includeNonFields = True, logObjectVariableName = "", itemPrefix = "", startingTabSize = 1, specificExportOverride=False):
+        # Nested objects write into the same emitter as their parent
         localVariableName = logObjectVariableName
         tabSize = startingTabSize
         childOverride = self._determineChildOverride(specificExportOverride)
         processingName = self._determineProcessingName(itemPrefix, specificExportOverride)
         if includeNonFields:
-            localVariableName, convertingFunctionString = self._adjustForNonFields(moduleName, zeekStructureName, allBitfields, tabSize)
+            localVariableName = self._adjustForNonFields(output, moduleName, zeekStructureName, allBitfields, tabSize)
         if self.linkIds != []:
-            convertingFunctionString += self._getLinkIDConvertingFunctions(tabSize, localVariableName, processingName)
+            self._getLinkIDConvertingFunctions(output, tabSize, localVariableName, processingName)
         for field in self.fields:
             if field.type == "switch":
-                convertingFunctionString += self._makeEventBackendForSwitch(field, processingName, moduleName, allEnums, allBitfields, allObjects, allSwitches, scopes, localVariableName, tabSize, childOverride, tabSize)
+                self._makeEventBackendForSwitch(output, field, processingName, moduleName, allEnums, allBitfields, allObjects, allSwitches, scopes, localVariableName, tabSize, childOverride, tabSize)
                 continue
-            tabSize, temp = self._updateOnConditionals(startingTabSize, field, specificExportOverride, processingName)
-            convertingFunctionString += temp
+            tabSize = self._updateOnConditionals(output, startingTabSize, field, specificExportOverride, processingName)
             if field.type == "bits":
-                convertingFunctionString += self._makeEventBackendForBits(field, scopes, allBitfields, allEnums, specificExportOverride, localVariableName, processingName, tabSize)
+                self._makeEventBackendForBits(output, field, scopes, allBitfields, allEnums, specificExportOverride, localVariableName, processingName, tabSize)
             elif field.type == "enum":
-                convertingFunctionString += self._makeEventBackendForEnum(field, scopes, allEnums, localVariableName, processingName, tabSize)
+                self._makeEventBackendForEnum(output, field, scopes, allEnums, localVariableName, processingName, tabSize)
             elif field.type == "object":
-                convertingFunctionString += self._makeEventBackendForObject(field, processingName, moduleName, allEnums, allBitfields, allObjects, allSwitches, scopes, localVariableName, tabSize, childOverride)
+                self._makeEventBackendForObject(output, field, processingName, moduleName, allEnums, allBitfields, allObjects, allSwitches, scopes, localVariableName, tabSize, childOverride)
             elif field.type == "list":
-                convertingFunctionString += self._makeEventBackendForList(field, processingName, tabSize, localVariableName, False)
+                self._makeEventBackendForList(output, field, processingName, tabSize, localVariableName, False)
             else: 
-                zeekName = utils.commandNameToConst(self.name).lower() + "_" + utils.commandNameToConst(field.name).lower()
-                convertingFunctionString += "{}{}${} = {}{};\n".format(utils.getTabString(tabSize), localVariableName, zeekName, processingName, field.name)
-            convertingFunctionString += self._finishOnConditionals(field, specificExportOverride, tabSize)
+                zeekName = utils.commandNameToConstLower(self.name) + "_" + utils.commandNameToConstLower(field.name)
+                output.line(tabSize, "{}${} = {}{};".format(localVariableName, zeekName, processingName, field.name))
+            self._finishOnConditionals(output, field, specificExportOverride, tabSize)
         if includeNonFields:
-            convertingFunctionString += self._finishForNonFields(localVariableName, startingTabSize, zeekStructureName)
-        return convertingFunctionString
- 
+            self._finishForNonFields(output, localVariableName, startingTabSize, zeekStructureName)
@@ -0,0 +1,142 @@
+# Copyright 2024, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
+
+# This file contains the writer for the generated parser package. Files whose
+# contents did not change are left untouched so their modification times do not
+# trigger a rebuild, and files generated by a previous run that are no longer
+# generated are removed.
+#
+# Files can also be written as part of a group, such as the files of one scope,
+# along with a hash of everything the group was generated from. When the hash
+# matches the previous run, the group's files are kept without generating them.
+# Groups can be written from several threads at once, each thread writing one
+# group at a time.
+import hashlib
+import json
+import os
+import threading
+
+MANIFEST_FILE_NAME = ".parsnip_manifest.json"
+MANIFEST_VERSION = 2
+
+_BACKEND_FOLDER = os.path.dirname(os.path.abspath(__file__))
+
+def calculateGeneratorHash():
+    # The generator's own code and templates are inputs of every file
+    generatorHash = hashlib.sha256()
+    for folder in [_BACKEND_FOLDER, os.path.join(_BACKEND_FOLDER, "templates")]:
+        for fileName in sorted(os.listdir(folder)):
+            filePath = os.path.join(folder, fileName)
+            if os.path.isfile(filePath) and (folder != _BACKEND_FOLDER or fileName.endswith(".py")):
+                generatorHash.update(fileName.encode())
+                with open(filePath, "rb") as file:
+                    generatorHash.update(file.read())
+    return generatorHash.hexdigest()
+
+def _hashContents(contents):
+    return hashlib.sha256(contents.encode()).hexdigest()
+
+def _hashFile(filePath):
+    try:
+        with open(filePath, "r") as file:
+            return _hashContents(file.read())
+    except (OSError, UnicodeDecodeError):
+        return None
+
+class OutputWriter:
+    def __init__(self, outRootFolder):
+        self.outRootFolder = outRootFolder
+        self.manifestPath = os.path.join(outRootFolder, MANIFEST_FILE_NAME)
+        manifest = self._loadManifest()
+        self.previousFiles = manifest.get("files", {})
+        self.previousGroups = manifest.get("groups", {})
+        # relative path -> hash of the contents
+        self.files = {}
+        # group name -> {"inputs": hash of the inputs, "files": relative paths}
+        self.groups = {}
+        self.groupInputs = {}
+        # The group being written by the current thread
+        self.currentGroup = threading.local()
+        self.lock = threading.Lock()
+        self.writtenCount = 0
+        self.unchangedCount = 0
+        self.removedCount = 0
+        self.reusedGroupCount = 0
+
+    def _loadManifest(self):
+        if not os.path.isfile(self.manifestPath):
+            return {}
+        try:
+            with open(self.manifestPath, "r") as file:
+                manifest = json.load(file)
+        except (OSError, ValueError):
+            return {}
+        if MANIFEST_VERSION != manifest.get("version"):
+            return {}
+        return manifest
+
+    def setGroupInputs(self, groupInputs):
+        # group name -> hash of everything the group's files are generated from
+        self.groupInputs = groupInputs
+
+    def reuseGroup(self, groupName):
+        # Keeps the files of the group from the previous run if its inputs are
+        # the same and its files were not modified since. Returns the relative
+        # paths of the kept files or None if the group has to be generated.
+        previousGroup = self.previousGroups.get(groupName)
+        if previousGroup is None or groupName not in self.groupInputs or \
+           previousGroup["inputs"] != self.groupInputs[groupName]:
+            return None
+        for relativePath in previousGroup["files"]:
+            filePath = os.path.join(self.outRootFolder, relativePath)
+            if relativePath not in self.previousFiles or _hashFile(filePath) != self.previousFiles[relativePath]:
+                return None
+        with self.lock:
+            for relativePath in previousGroup["files"]:
+                self.files[relativePath] = self.previousFiles[relativePath]
+            self.groups[groupName] = previousGroup
+            self.unchangedCount += len(previousGroup["files"])
+            self.reusedGroupCount += 1
+        return previousGroup["files"]
+
+    def startGroup(self, groupName):
+        self.currentGroup.name = groupName
+        with self.lock:
+            self.groups[groupName] = {"inputs": self.groupInputs.get(groupName), "files": []}
+
+    def endGroup(self):
+        self.currentGroup.name = None
+
+    def write(self, filePath, contents):
+        contentsHash = _hashContents(contents)
+        relativePath = os.path.relpath(filePath, self.outRootFolder)
+        groupName = getattr(self.currentGroup, "name", None)
+        with self.lock:
+            self.files[relativePath] = contentsHash
+            if groupName is not None:
+                self.groups[groupName]["files"].append(relativePath)
+        if _hashFile(filePath) == contentsHash:
+            with self.lock:
+                self.unchangedCount += 1
+            return
+        with open(filePath, "w") as file:
+            file.write(contents)
+        with self.lock:
+            self.writtenCount += 1
+
+    def finish(self):
+        # Removes the files only the previous run generated and records what
+        # this run generated
+        for relativePath in self.previousFiles:
+            if relativePath not in self.files:
+                filePath = os.path.join(self.outRootFolder, relativePath)
+                if os.path.isfile(filePath):
+                    os.remove(filePath)
+                    self.removedCount += 1
+        # Sorted, since groups written at the same time finish in any order
+        with open(self.manifestPath, "w") as file:
+            json.dump({"version": MANIFEST_VERSION, "files": self.files, "groups": self.groups}, file, indent=4, sort_keys=True)
+
+    def printSummary(self):
+        print("Output files: {0} written, {1} unchanged, {2} removed".format(self.writtenCount, self.unchangedCount, self.removedCount))
+        if self.reusedGroupCount > 0:
+            print("Reused {0} of {1} file groups without generating them".format(self.reusedGroupCount, len(self.groups)))
@@ -3,6 +3,8 @@
 import utils
         
 class SwitchAction:
+    __slots__ = ("name", "type", "referenceType", "elementType", "inputs", "scope", "size", "until")
+
     def __init__(self, name, type, referenceType, scope=""):
         self.name = name
         self.type = type
@@ -21,6 +23,8 @@ class SwitchAction:
             self.inputs.append(input)
 
 class SwitchOption:
+    __slots__ = ("value", "action")
+
     def __init__(self, value):
         self.value = value
         self.action = None
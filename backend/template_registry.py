@@ -0,0 +1,41 @@
+# Copyright 2024, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
+
+# This file contains the registry of output templates. Every template is read
+# and compiled once per process, relative to this file rather than to the
+# current working directory.
+import os
+import threading
+from string import Template
+
+TEMPLATE_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+
+# template name -> (contents, compiled template), None until the templates are
+# loaded. The dictionary is filled before it is published, so a thread that
+# sees it never sees it partly loaded.
+_templates = None
+_templatesLock = threading.Lock()
+
+def _loadTemplates():
+    global _templates
+    with _templatesLock:
+        if _templates is not None:
+            return _templates
+        templates = {}
+        for templateName in sorted(os.listdir(TEMPLATE_FOLDER)):
+            with open(os.path.join(TEMPLATE_FOLDER, templateName), "r") as file:
+                contents = file.read()
+            templates[templateName] = (contents, Template(contents))
+        _templates = templates
+        return _templates
+
+def _getEntry(templateName):
+    templates = _templates
+    if templates is None:
+        templates = _loadTemplates()
+    return templates[templateName]
+
+def getContents(templateName):
+    return _getEntry(templateName)[0]
+
+def getTemplate(templateName):
+    return _getEntry(templateName)[1]
@@ -1,17 +1,17 @@
 # Copyright 2024, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
 
+import functools
 import re
 from math import ceil
+
+import generation_context
+
 TAB_SIZE = 4
 SINGLE_TAB = " " * TAB_SIZE
 DOUBLE_TAB = SINGLE_TAB * 2
-PROTOCOL_NAME = ""
 DEFAULT_SCOPE = "general"
 CONVERSION_SCOPE = "conversion"
 ID_SCOPE = "generateid"
-USES_LAYER_2 = False
-
-scopesHaveCrossScopeLinks = {}
 
 def getTabString(tabSize):
     return SINGLE_TAB * tabSize
@@ -36,7 +36,29 @@ spicyToZeek = {
     "bytes"     : "string",
     "time"      : "time"
 }
-customFieldTypes = {}
+
+# Builds the symbolIndex of a generation context:
+# (kind, name) -> [(scope, normalized scope, structure)] for every scope that
+# defines a structure with that name, in the configured scope order
+def buildSymbolIndex(scopes, objects, switches, bitfields, enums):
+    index = {}
+    for scope in scopes:
+        for kind, structures in [("object", objects), ("switch", switches), ("bitfield", bitfields), ("enum", enums)]:
+            normalScope = normalizedScope(scope, kind)
+            for name, structure in structures.get(normalScope, {}).items():
+                index.setdefault((kind, name), []).append((scope, normalScope, structure))
+    return index
+
+def findSymbols(kind, name):
+    return generation_context.current().symbolIndex.get((kind, name), [])
+
+def findSymbol(kind, name):
+    # Returns the definition in the first scope, like scanning the scopes in
+    # order would
+    symbols = generation_context.current().symbolIndex.get((kind, name))
+    if symbols is None:
+        return (None, None, None)
+    return symbols[0]
 
 def zeekTypeMapping(spicyType):
     if spicyType in spicyToZeek:
@@ -45,9 +67,28 @@ def zeekTypeMapping(spicyType):
         print("Unknown type {0}".format(spicyType))
         return spicyType
 
+_WORD_START = re.compile(r'(.)([A-Z][a-z]+)')
+_WORD_BOUNDARY = re.compile(r'([a-z0-9])([A-Z])')
+
+# command name -> (const name, lowercase const name, uppercase const name).
+# The names do not depend on the protocol, so the cache is shared by every
+# protocol and only keeps the most recently used names
+CONST_NAME_CACHE_SIZE = 65536
+
+@functools.lru_cache(maxsize=CONST_NAME_CACHE_SIZE)
+def _constNameForms(commandName):
+    name = _WORD_START.sub(r'\1_\2', commandName)
+    name = _WORD_BOUNDARY.sub(r'\1_\2', name)
+    return (name, name.lower(), name.upper())
+
 def commandNameToConst(commandName):
-    name = re.sub(r'(.)([A-Z][a-z]+)', r'\1_\2', commandName)
-    return re.sub(r'([a-z0-9])([A-Z])', r'\1_\2', name)
+    return _constNameForms(commandName)[0]
+
+def commandNameToConstLower(commandName):
+    return _constNameForms(commandName)[1]
+
+def commandNameToConstUpper(commandName):
+    return _constNameForms(commandName)[2]
     
 def calculateColumn(nameLength):
     return ceil((nameLength + 1) / TAB_SIZE) * TAB_SIZE
@@ -56,23 +97,34 @@ def endingSpace(columns, nameLength):
     return " " * (columns - nameLength)
     
 def normalizedScope(scope, itemType):
-    if scope == "general" or PROTOCOL_NAME.upper() == scope:
+    # Every structure from the same scope shares one copy of the string, kept
+    # by (scope, is enum) in the generation context
+    context = generation_context.current()
+    key = (scope, "enum" == itemType)
+    normalizedScopes = context.normalizedScopes
+    if key not in normalizedScopes:
+        normalizedScopes[key] = _normalizeScope(context.protocolName, scope, itemType)
+    return normalizedScopes[key]
+
+def _normalizeScope(protocolName, scope, itemType):
+    if scope == "general" or protocolName.upper() == scope:
         if "enum" == itemType:
-            return PROTOCOL_NAME.upper() + "_ENUM"
+            return protocolName.upper() + "_ENUM"
         else:
-            return PROTOCOL_NAME.upper()
+            return protocolName.upper()
     elif scope != "":
         if "enum" == itemType:
             scope = scope + "_enum"
-        return PROTOCOL_NAME.upper() + "_" + scope.upper()
+        return protocolName.upper() + "_" + scope.upper()
     else:
         return ""
         
 def loggingParentScope(scope):
-    if scope == "general" or PROTOCOL_NAME.upper() == scope:
+    protocolName = generation_context.current().protocolName
+    if scope == "general" or protocolName.upper() == scope:
         return "general"
-    elif scope.startswith(PROTOCOL_NAME.upper()):
-        temp = scope[len(PROTOCOL_NAME.upper()) + 1:]
+    elif scope.startswith(protocolName.upper()):
+        temp = scope[len(protocolName.upper()) + 1:]
         return temp.lower()
     else:
         print("Unexepected scope: {}".format(scope))
@@ -259,12 +311,6 @@ def determineSpicyStringForType(itemName, itemType, elementType, referenceType,
         return ("", "")
 
 def getObject(referenceType, scopes, allObjects):
-    referencedObject = None
-    objectScope = None
-    for scope in scopes:
-        if referenceType in allObjects[normalizedScope(scope, "object")]:
-                referencedObject = allObjects[normalizedScope(scope, "object")][referenceType]
-                objectScope = scope
-                break
+    objectScope, _, referencedObject = findSymbol("object", referenceType)
     return referencedObject, objectScope
 
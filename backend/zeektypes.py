@@ -4,6 +4,8 @@ from string import Template
 from math import ceil 
 import re
 import utils
+import generation_context
+import emitter
 import generation_utils
 
 TYPE_TO_EMPTY  = {
@@ -22,6 +24,8 @@ genericZeekField = Template("""
     """)
 
 class ZeekField:
+    __slots__ = ("name", "type")
+
     def __init__(self, name="", type=""):
         self.name = name
         self.type = type
@@ -37,93 +41,86 @@ class ZeekMain:
                 return
         self.records.append(record)
         
-    def _generateLogStreamIndividualString(self, record, indent, isSingle):
-        returnString = ""
+    def _generateLogStreamIndividualString(self, output, record, indent, isSingle):
+        context = generation_context.current()
         pathName = record.name.lower()
         if not isSingle:
             pathName = pathName.replace("_log", "")
         recordLogName = "LOG_{}".format(record.name.upper())
-        returnString += "{}Log::create_stream({}::{},\n".format(indent, utils.PROTOCOL_NAME.upper(), recordLogName)
-        returnString += "{}[$columns={}{},\n".format(indent, record.scope, record.name)
-        returnString += "{}$ev=log_{},\n".format(indent, record.name.lower())
+        output.write("{}Log::create_stream({}::{},\n".format(indent, context.protocolName.upper(), recordLogName))
+        output.write("{}[$columns={}{},\n".format(indent, record.scope, record.name))
+        output.write("{}$ev=log_{},\n".format(indent, record.name.lower()))
         # If the record is named "general", don't append the name to the path
         if pathName == "general":
-            returnString += "{}$path=\"{}\",\n".format(indent, utils.PROTOCOL_NAME.lower())
+            output.write("{}$path=\"{}\",\n".format(indent, context.protocolName.lower()))
         else:
-            returnString += "{}$path=\"{}_{}\",\n".format(indent, utils.PROTOCOL_NAME.lower(), pathName)
-        #returnString += "{}$path=\"{}_{}\",\n".format(indent, utils.PROTOCOL_NAME.lower(), pathName)
-        returnString += "{}$policy=log_policy_{}]);\n".format(indent, record.name.lower())
-        return returnString
+            output.write("{}$path=\"{}_{}\",\n".format(indent, context.protocolName.lower(), pathName))
+        #output.write("{}$path=\"{}_{}\",\n".format(indent, context.protocolName.lower(), pathName))
+        output.write("{}$policy=log_policy_{}]);\n".format(indent, record.name.lower()))
         
-    def _generateLogStreamString(self, records):
-        returnString = ""
+    def _generateLogStreamString(self, output, records):
         if len(records) > 1:
             for record in self.records:
-                returnString += self._generateLogStreamIndividualString(record, utils.SINGLE_TAB, False)
+                self._generateLogStreamIndividualString(output, record, utils.SINGLE_TAB, False)
         else:            
-            returnString += self._generateLogStreamIndividualString(self.records[0], " " * 22, True)
-        return returnString
+            self._generateLogStreamIndividualString(output, self.records[0], " " * 22, True)
         
-    def _generateFileString(self, records):
-        returnString = utils.SINGLE_TAB + "redef enum Log::ID += {"
+    def _generateFileString(self, output, records):
+        output.write(utils.SINGLE_TAB + "redef enum Log::ID += {")
         if len(records) > 1:
-            returnString += "\n"
+            output.write("\n")
             for record in records:
                 recordLogName = "LOG_{}".format(record.name.upper())
-                returnString += "{}{}".format(" " * 28, recordLogName)
+                output.write("{}{}".format(" " * 28, recordLogName))
                 if record != self.records[len(self.records) - 1]:
-                    returnString += ","
-                returnString += "\n"
-            returnString += (" " * 27)
+                    output.write(",")
+                output.write("\n")
+            output.write(" " * 27)
         else:
             recordLogName = "LOG_{}".format(records[0].name.upper())
-            returnString += " {} ".format(recordLogName)
-        returnString += "};\n\n"
-        return returnString
+            output.write(" {} ".format(recordLogName))
+        output.write("};\n\n")
         
-    def _generateGlobals(self, records):
-        returnString = ""
+    def _generateGlobals(self, output, records):
         for record in records:
             recordLogEventName = "log_{}".format(record.name.lower())
             recordLogPolicyName = "log_policy_{}".format(record.name.lower())
-            returnString += "{}global {}: event(rec: {}{});\n".format(utils.SINGLE_TAB, recordLogEventName, record.scope, record.name)
-            returnString += "{}global {}: Log::PolicyHook;\n".format(utils.SINGLE_TAB, recordLogPolicyName)
-        return returnString
+            output.line(1, "global {}: event(rec: {}{});".format(recordLogEventName, record.scope, record.name))
+            output.line(1, "global {}: Log::PolicyHook;".format(recordLogPolicyName))
         
-    def _generateEmits(self, records):
-        returnString = ""
+    def _generateEmits(self, output, records):
+        context = generation_context.current()
         for record in records:
-            recordLogEventName = "log_{}".format(record.name.lower())
-            returnString += "{}global emit_{}_{}: function(".format(utils.SINGLE_TAB, utils.PROTOCOL_NAME.lower(), record.name.lower())
-            if utils.USES_LAYER_2:
+            output.write("{}global emit_{}_{}: function(".format(utils.SINGLE_TAB, context.protocolName.lower(), record.name.lower()))
+            if context.usesLayer2:
                 if record.scope != "":
-                    returnString += "{}_record: {}::{}".format(record.name.lower(), record.scope, record.name)
+                    output.write("{}_record: {}::{}".format(record.name.lower(), record.scope, record.name))
                 else:
-                    returnString += "{}_record: {}".format(record.name.lower(), record.name)
+                    output.write("{}_record: {}".format(record.name.lower(), record.name))
             else:
-                returnString += "c: connection"
-            returnString += ");\n"
-        return returnString
+                output.write("c: connection")
+            output.write(");\n")
         
-    def _generateConnections(self, records):
-        returnString = ""
-        returnString += "# redefine connection record to contain one of each of the {} records\n".format(utils.PROTOCOL_NAME.lower())
-        returnString += "redef record connection += {\n"
+    def _generateConnections(self, output, records):
+        context = generation_context.current()
+        output.write("# redefine connection record to contain one of each of the {} records\n".format(context.protocolName.lower()))
+        output.write("redef record connection += {\n")
         for record in records:
-            returnString += "{}{}_{}: {}{} &optional;\n".format(utils.SINGLE_TAB, utils.PROTOCOL_NAME.lower(), record.name.lower(), record.scope, record.name)
-        returnString += "};\n\n"
-        return returnString
+            output.line(1, "{}_{}: {}{} &optional;".format(context.protocolName.lower(), record.name.lower(), record.scope, record.name))
+        output.write("};\n\n")
 
     def generateMainFile(self, usesLayer2, configuration):
-        fileString = "export {\n"
-        fileString += self._generateFileString(self.records)
-        fileString += self._generateGlobals(self.records)
-        fileString += self._generateEmits(self.records)
-        fileString += "\n}\n\n"
+        context = generation_context.current()
+        output = emitter.Emitter()
+        output.write("export {\n")
+        self._generateFileString(output, self.records)
+        self._generateGlobals(output, self.records)
+        self._generateEmits(output, self.records)
+        output.write("\n}\n\n")
         
-        fileString += self._generateConnections(self.records)
+        self._generateConnections(output, self.records)
         
-        analyzerString = ""
+        analyzerOutput = emitter.Emitter()
         if [] != configuration.ports:
             tempPorts = {}
             for port in configuration.ports:
@@ -132,45 +129,45 @@ class ZeekMain:
                     tempPorts[protocol] = []
                 tempPorts[protocol].append(port.get("port"))
             for key in tempPorts:
-                fileString += "# Define {0} ports\n".format(key)
-                fileString += "const {0}_ports = {{\n".format(key)
+                output.write("# Define {0} ports\n".format(key))
+                output.write("const {0}_ports = {{\n".format(key))
                 for value in tempPorts[key]:
-                    fileString += "{0}{1}/{2},\n".format(utils.SINGLE_TAB, value, key)
-                fileString += "};\n\n"
-                analyzerString += "{0}Analyzer::register_for_ports(Analyzer::ANALYZER_SPICY_{1}, {2});\n".format(utils.SINGLE_TAB, "{0}_{1}".format(utils.PROTOCOL_NAME.upper(), key.upper()), "{0}_ports".format(key))
-        fileString += "# Initialization Function\n"
-        fileString += "event zeek_init() &priority=5 {\n"
+                    output.line(1, "{0}/{1},".format(value, key))
+                output.write("};\n\n")
+                analyzerOutput.line(1, "Analyzer::register_for_ports(Analyzer::ANALYZER_SPICY_{0}, {1});".format("{0}_{1}".format(context.protocolName.upper(), key.upper()), "{0}_ports".format(key)))
+        output.write("# Initialization Function\n")
+        output.write("event zeek_init() &priority=5 {\n")
         # Handle ethernet registration if necessary
         if usesLayer2:
-            fileString += "{0}# Register on top of Ethernet\n".format(utils.SINGLE_TAB)
-            fileString += "{0}if ( ! PacketAnalyzer::try_register_packet_analyzer_by_name(\"Ethernet\", {1}, \"spicy_{2}\") )\n".format(utils.SINGLE_TAB, configuration.ethernetProtocolNumber, utils.PROTOCOL_NAME.upper())
-            fileString += "{0}Reporter::error(\"cannot register Spicy analyzer\");".format(utils.DOUBLE_TAB)
-            fileString += "\n"
-        fileString += "{}# initialize logging streams for all {} logs\n".format(utils.SINGLE_TAB, utils.PROTOCOL_NAME.lower())
-        fileString += self._generateLogStreamString(self.records)
-        fileString += analyzerString
-        fileString += "}\n"
-        return fileString
+            output.line(1, "# Register on top of Ethernet")
+            output.line(1, "if ( ! PacketAnalyzer::try_register_packet_analyzer_by_name(\"Ethernet\", {0}, \"spicy_{1}\") )".format(configuration.ethernetProtocolNumber, context.protocolName.upper()))
+            output.line(2, "Reporter::error(\"cannot register Spicy analyzer\");")
+        output.line(1, "# initialize logging streams for all {} logs".format(context.protocolName.lower()))
+        self._generateLogStreamString(output, self.records)
+        output.write(analyzerOutput.getValue())
+        output.write("}\n")
+        return output.getValue()
     
     def addLoggingFunction(self):
-        functionsString = ""
+        context = generation_context.current()
+        output = emitter.Emitter()
         for record in self.records:
-            connectionName = "{}_{}".format(utils.PROTOCOL_NAME.lower(), record.name.lower())
-            if utils.USES_LAYER_2:
+            connectionName = "{}_{}".format(context.protocolName.lower(), record.name.lower())
+            if context.usesLayer2:
                 if record.scope != "":
-                    recordScope = "{}_{}::".format(utils.PROTOCOL_NAME.upper(), record.name.upper())
-                    fileString += "{}global emit_{}_{}: function({}_record: {}::{});\n".format(utils.SINGLE_TAB, utils.PROTOCOL_NAME.lower(), record.name.lower(), recordScope, record.name.lower())
+                    recordScope = "{}_{}::".format(context.protocolName.upper(), record.name.upper())
+                    fileString += "{}global emit_{}_{}: function({}_record: {}::{});\n".format(utils.SINGLE_TAB, context.protocolName.lower(), record.name.lower(), recordScope, record.name.lower())
                 else:
-                    functionsString += "function emit_{}_{}({}_record: {}) {{\n".format(utils.PROTOCOL_NAME.lower(), record.name.lower(), record.name.lower(), record.name)
-                functionsString += "{}Log::write({}::LOG_{}, {}_record);\n".format(utils.SINGLE_TAB, utils.PROTOCOL_NAME.upper(), record.name.upper(), record.name.lower())
+                    output.write("function emit_{}_{}({}_record: {}) {{\n".format(context.protocolName.lower(), record.name.lower(), record.name.lower(), record.name))
+                output.line(1, "Log::write({}::LOG_{}, {}_record);".format(context.protocolName.upper(), record.name.upper(), record.name.lower()))
             else:
-                functionsString += "function emit_{}_{}(c: connection) {{\n".format(utils.PROTOCOL_NAME.lower(), record.name.lower())
-                functionsString += "{}if (! c?${} )\n".format(utils.SINGLE_TAB, connectionName)
-                functionsString += "{}return;\n".format(utils.DOUBLE_TAB)
-                functionsString += "{}Log::write({}::LOG_{}, c${});\n".format(utils.SINGLE_TAB, utils.PROTOCOL_NAME.upper(), record.name.upper(), connectionName)
-                functionsString += "{}delete c${};\n".format(utils.SINGLE_TAB, connectionName)
-            functionsString += "}\n\n"
-        return functionsString
+                output.write("function emit_{}_{}(c: connection) {{\n".format(context.protocolName.lower(), record.name.lower()))
+                output.line(1, "if (! c?${} )".format(connectionName))
+                output.line(2, "return;")
+                output.line(1, "Log::write({}::LOG_{}, c${});".format(context.protocolName.upper(), record.name.upper(), connectionName))
+                output.line(1, "delete c${};".format(connectionName))
+            output.write("}\n\n")
+        return output.getValue()
 
 class ZeekRecord:
     def initializeRecordFields(self):
@@ -180,7 +177,7 @@ class ZeekRecord:
         timestampField = ZeekField()
         timestampField.name = "ts"
         timestampField.type = "time"
-        if utils.USES_LAYER_2:
+        if generation_context.current().usesLayer2:
             commonFields = [timestampField]
         else:
             uidField = ZeekField()
@@ -197,8 +194,8 @@ class ZeekRecord:
         self.fields = []
         self.commandStructures = []
         self.column = 8
-        #self.name = utils.commandNameToConst(name).lower() + "_log" -> removed extra "_log" from output log filename
-        self.name = utils.commandNameToConst(name).lower()
+        #self.name = utils.commandNameToConstLower(name) + "_log" -> removed extra "_log" from output log filename
+        self.name = utils.commandNameToConstLower(name)
 
         # self.subname = ""
         self.logName = ""
@@ -208,7 +205,7 @@ class ZeekRecord:
         else:
             scopeName = scope
         if scopeName != "general":
-            self.scope = "{}_{}::".format(utils.PROTOCOL_NAME.upper(), scopeName.upper())
+            self.scope = "{}_{}::".format(generation_context.current().protocolName.upper(), scopeName.upper())
         else:
             self.scope = ""
         self.externalLinkFields = []
@@ -250,43 +247,46 @@ class ZeekRecord:
                 self.fields.append(field)
 
     def addHook(self):
+        context = generation_context.current()
         #TODO: Handle header information; Maybe add additional initial formatting
-        hookString = ""
-        if not utils.USES_LAYER_2:
-            hookString = "hook set_session_{}(c: connection) {{\n".format(self.name.lower())
-            hookString += "{}if ( ! c?${}_{} )\n".format(utils.SINGLE_TAB, utils.PROTOCOL_NAME.lower(), self.name.lower())
-            hookString += "{}c${}_{} = {}(\n".format(utils.DOUBLE_TAB, utils.PROTOCOL_NAME.lower(), self.name.lower(), self.name)
-            hookString += "{}$ts=network_time(),\n".format(utils.SINGLE_TAB * 3)
-            hookString += "{}$uid=c$uid,\n".format(utils.SINGLE_TAB * 3)
-            hookString += "{}$id=c$id,\n".format(utils.SINGLE_TAB * 3)
-            hookString += "{}$proto=get_conn_transport_proto(c$id));\n".format(utils.SINGLE_TAB * 3)
-            hookString += "}\n\n"
-        return hookString
+        if context.usesLayer2:
+            return ""
+        output = emitter.Emitter()
+        output.write("hook set_session_{}(c: connection) {{\n".format(self.name.lower()))
+        output.line(1, "if ( ! c?${}_{} )".format(context.protocolName.lower(), self.name.lower()))
+        output.line(2, "c${}_{} = {}(".format(context.protocolName.lower(), self.name.lower(), self.name))
+        output.line(3, "$ts=network_time(),")
+        output.line(3, "$uid=c$uid,")
+        output.line(3, "$id=c$id,")
+        output.line(3, "$proto=get_conn_transport_proto(c$id));")
+        output.write("}\n\n")
+        return output.getValue()
 
     def addCommandStructure(self, commandStructure):
         if commandStructure not in self.commandStructures and (commandStructure.logIndependently or not commandStructure.logWithParent):
             self.commandStructures.append(commandStructure)
     
     def addFunctions(self, moduleName, allEnums, allBitfields, allObjects, allSwitches, scopes):
-        functionString = ""
+        output = emitter.Emitter()
         for command in self.commandStructures:
-            functionString += command.makeEventBackend(moduleName, self.name, allEnums, allBitfields, allObjects, allSwitches, scopes)
-        return functionString
+            command.emitEventBackend(output, moduleName, self.name, allEnums, allBitfields, allObjects, allSwitches, scopes)
+        return output.getValue()
 
     def createRecord(self):
-        recordString = ""
-        recordString += "{}type {}: record {{\n".format(utils.SINGLE_TAB, self.name)
+        output = emitter.Emitter()
+        output.line(1, "type {}: record {{".format(self.name))
         for field in self.defaultRecords:
             paddingSize = (self.column - len(field.name))
             padding = paddingSize * ' '
-            recordString += "{}{}{}: {} &log;\n".format(utils.DOUBLE_TAB, field.name, padding, field.type)
+            output.line(2, "{}{}: {} &log;".format(field.name, padding, field.type))
         for field in self.externalLinkFields:
             paddingSize = (self.column - len(field.name))
             padding = paddingSize * ' '
-            recordString += "{}{}{}: {} &log &optional;\n".format(utils.DOUBLE_TAB, field.name, padding, field.type)
+            output.line(2, "{}{}: {} &log &optional;".format(field.name, padding, field.type))
         for field in self.fields:
             paddingSize = (self.column - len(field.name))
             padding = paddingSize * ' '
-            recordString += "{}{}{}: {} &log &optional;\n".format(utils.DOUBLE_TAB, field.name, padding, field.type)
-        recordString += "{}}};\n\n".format(utils.SINGLE_TAB)
-        return recordString
+            output.line(2, "{}{}: {} &log &optional;".format(field.name, padding, field.type))
+        output.line(1, "};")
+        output.write("\n")
+        return output.getValue()